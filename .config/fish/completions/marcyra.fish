@@ -1,7 +1,7 @@
 set -l seen '__fish_seen_subcommand_from'
 set -l has_opt '__fish_contains_opt'
 
-set -l commands shell toggle scheme screenshot record clipboard emoji-picker wallpaper resizer
+set -l commands shell toggle scheme screenshot record clipboard emoji-picker wallpaper resizer cache
 set -l not_seen "not $seen $commands"
 
 
@@ -16,6 +16,7 @@ complete -c marcyra -s 'h' -l 'help' -d 'Show help'
 # Subcommands
 complete -c marcyra -n $not_seen -a 'wallpaper' -d 'Manage the wallpapers'
 complete -c marcyra -n $not_seen -a 'shell' -d 'Start the shell or message it'
+complete -c marcyra -n $not_seen -a 'cache' -d 'Inspect the cache'
 #############
 ### SHELL ###
 #############
@@ -137,6 +138,30 @@ complete -c marcyra -n "$seen wallpaper" -l min-size -x \
 complete -c marcyra -n "$seen wallpaper" -l no-symlinks \
   -d 'Skip creating or updating symlink directories'
 
+# -j/--jobs: worker processes for feature extraction
+complete -c marcyra -n "$seen wallpaper" -s j -l jobs -x \
+  -d 'Worker processes for feature extraction when sorting'
+
+# --full/--drift: incremental sorting controls
+complete -c marcyra -n "$seen wallpaper" -l full \
+  -d 'Re-cluster the whole library'
+complete -c marcyra -n "$seen wallpaper" -l drift -x \
+  -d 'Share of changed images that triggers a re-cluster'
+
+# --no-repeat/--favourite: random selection
+complete -c marcyra -n "$seen wallpaper" -l no-repeat -x \
+  -d 'Never pick any of the last N wallpapers shown'
+complete -c marcyra -n "$seen wallpaper; and not $seen daemon" -l favourite -rF \
+  -d 'Add or remove a wallpaper from the favourites'
+
+# daemon: resident random rotation
+complete -c marcyra -n "$seen wallpaper; and not $seen daemon" \
+  -a daemon -d 'Rotate random wallpapers in the background'
+complete -c marcyra -n "$seen wallpaper; and $seen daemon" \
+  -a '(__marcyra_list_wall_dirs)' -d 'Wallpaper directory'
+complete -c marcyra -n "$seen wallpaper; and $seen daemon" -s i -l interval -x \
+  -d 'Seconds between rotations'
+
 
 # marcyra scheme completions
 
@@ -168,8 +193,10 @@ complete -c marcyra -n 'not __fish_seen_subcommand_from scheme' \
   -a scheme -d 'manage the colour scheme'
 
 # Inside "scheme", offer its subcommands when none picked
-complete -c marcyra -n '__fish_seen_subcommand_from scheme; and not __fish_seen_subcommand_from list get set' \
+complete -c marcyra -n '__fish_seen_subcommand_from scheme; and not __fish_seen_subcommand_from list get set warm' \
   -a 'list get set' -d 'list/get/set scheme data'
+complete -c marcyra -n '__fish_seen_subcommand_from scheme; and not __fish_seen_subcommand_from list get set warm' \
+  -a warm -d 'precompute dynamic schemes for the wallpaper bucket centroids'
 
 # ----
 # list
@@ -218,3 +245,21 @@ complete -c marcyra -n '__fish_seen_subcommand_from scheme; and __fish_seen_subc
   -s m -l mode -x -a '(__marcyra_scheme_modes)' -d 'the mode to switch to'
 complete -c marcyra -n '__fish_seen_subcommand_from scheme; and __fish_seen_subcommand_from set' \
   -s v -l variant -x -a '(__marcyra_scheme_variants)' -d 'the variant to switch to'
+
+#############
+### CACHE ###
+#############
+
+complete -c marcyra -n '__fish_seen_subcommand_from cache; and not __fish_seen_subcommand_from stats gc' \
+  -a stats -d 'print cache size and entry counts'
+complete -c marcyra -n '__fish_seen_subcommand_from cache; and not __fish_seen_subcommand_from stats gc' \
+  -a gc -d 'remove unused cache entries'
+
+complete -c marcyra -n '__fish_seen_subcommand_from cache; and __fish_seen_subcommand_from gc' \
+  -l max-size -x -d 'evict least recently used entries above this size'
+complete -c marcyra -n '__fish_seen_subcommand_from cache; and __fish_seen_subcommand_from gc' \
+  -l max-age -x -d 'remove entries unused for this many days'
+complete -c marcyra -n '__fish_seen_subcommand_from cache; and __fish_seen_subcommand_from gc' \
+  -l keep-orphans -d 'keep entries whose source image no longer exists'
+complete -c marcyra -n '__fish_seen_subcommand_from cache; and __fish_seen_subcommand_from gc' \
+  -s n -l dry-run -d 'only report what would be removed'
@@ -1,7 +1,16 @@
-from marcyra.parser import build_parser
+import os
+
+if os.getenv("MARCYRA_IMPORT_PROFILE"):
+    from marcyra.utils.importprofile import enable
+
+    enable()
+
+from marcyra.parser import build_parser  # noqa: E402
+from marcyra.utils.logging import set_verbose  # noqa: E402
 
 
 def main(argv=None) -> None:
     parser = build_parser()
     args = parser.parse_args(argv)
+    set_verbose(args.verbose)
     return args.func(args)
@@ -1,5 +1,16 @@
 import argparse
-from importlib import metadata
+
+
+class VersionAction(argparse.Action):
+    """`--version` that only loads package metadata when it is actually requested."""
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from importlib import metadata
+
+        parser.exit(message=f"{parser.prog} {metadata.version('marcyra')}\n")
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -10,9 +21,10 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "-v",
         "--version",
-        action="version",
-        version=f"%(prog)s {metadata.version('marcyra')}",
+        action=VersionAction,
+        help="show program's version number and exit",
     )
+    parser.add_argument("--verbose", action="store_true", help="print timings and cache statistics to stderr")
 
     subparsers = parser.add_subparsers(
         title="subcommands",
@@ -21,9 +33,10 @@ def build_parser() -> argparse.ArgumentParser:
         help="the subcommand to run",
         required=True,
     )
-    from marcyra.subcommands import wallpaper, shell, scheme
+    from marcyra.subcommands import wallpaper, shell, scheme, cache
 
     wallpaper.register(subparsers)
     shell.register(subparsers)
     scheme.register(subparsers)
+    cache.register(subparsers)
     return parser
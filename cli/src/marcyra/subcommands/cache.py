@@ -0,0 +1,111 @@
+import os
+from pathlib import Path
+
+from marcyra.utils.paths import (
+    discord_cache_dir,
+    hash_index_path,
+    library_index_path,
+    m_cache_dir,
+    template_cache_dir,
+    wallpapers_cache_dir,
+)
+
+
+def register(subparsers):
+    cache_parser = subparsers.add_parser("cache", help="inspect and clean the cache")
+    cache_command_subparser = cache_parser.add_subparsers(title="subcommands")
+
+    stats_parser = cache_command_subparser.add_parser("stats", help="print cache size and entry counts")
+
+    gc_parser = cache_command_subparser.add_parser("gc", help="remove unused cache entries")
+    gc_parser.add_argument(
+        "--max-size",
+        metavar="SIZE",
+        help="evict least recently used entries above this size, e.g. 500M (default: $MARCYRA_CACHE_MAX_SIZE)",
+    )
+    gc_parser.add_argument(
+        "--max-age",
+        metavar="DAYS",
+        type=float,
+        help="remove entries unused for this many days (default: $MARCYRA_CACHE_MAX_AGE)",
+    )
+    gc_parser.add_argument(
+        "--keep-orphans", action="store_true", help="keep entries whose source image no longer exists"
+    )
+    gc_parser.add_argument("-n", "--dry-run", action="store_true", help="only report what would be removed")
+
+    stats_parser.set_defaults(func=run_stats)
+    gc_parser.set_defaults(func=run_gc)
+    cache_parser.set_defaults(func=run_stats)
+
+    return cache_parser
+
+
+def format_size(size: float) -> str:
+    for unit in "B", "KiB", "MiB":
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def dir_usage(directory: Path) -> tuple[int, int]:
+    """Number of files and total bytes under a directory (0, 0 if it does not exist)."""
+    files = size = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for name in filenames:
+            try:
+                size += os.path.getsize(os.path.join(dirpath, name))
+                files += 1
+            except OSError:
+                pass
+    return files, size
+
+
+def run_stats(args):
+    from marcyra.utils.cachestore import get_cache_store
+
+    store = get_cache_store()
+    stats = store.stats()
+    wal = Path(f"{store.path}-wal")
+    db_size = stats["bytes"] + (wal.stat().st_size if wal.exists() else 0)
+
+    print(f"Cache: {m_cache_dir}")
+    print(f"  store:      {format_size(db_size)} ({format_size(stats['free_bytes'])} free) in {store.path.name}")
+    print(f"    images:   {stats['images']} ({stats['scores']} scored, {stats['smart']} with smart options)")
+    print(f"    schemes:  {stats['palettes']} primaries")
+
+    total = db_size
+    for label, path in (
+        ("thumbnails", wallpapers_cache_dir),
+        ("templates", template_cache_dir),
+        ("discord", discord_cache_dir),
+    ):
+        files, size = dir_usage(path)
+        total += size
+        print(f"  {label + ':':<11} {format_size(size)} in {files} files")
+
+    for label, path in ("hash index", hash_index_path), ("library", library_index_path):
+        if path.exists():
+            size = path.stat().st_size
+            total += size
+            print(f"  {label + ':':<11} {format_size(size)}")
+
+    print(f"  {'total:':<11} {format_size(total)}")
+
+
+def run_gc(args):
+    from marcyra.utils.cachegc import collect, parse_size, policy_from_env
+
+    max_bytes, max_age = policy_from_env()
+    if args.max_size is not None:
+        max_bytes = parse_size(args.max_size)
+    if args.max_age is not None:
+        max_age = args.max_age * 86400
+
+    report = collect(max_bytes, max_age, orphans=not args.keep_orphans, dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"{verb} {report['images']} images and {report['palettes']} schemes, "
+        f"{'freeing' if args.dry_run else 'reclaimed'} {format_size(report['bytes'])}"
+    )
@@ -1,6 +1,11 @@
 import json
+import sys
+from typing import Iterator
+
+from marcyra.utils.material import get_colours_for_image
 from marcyra.utils.scheme import (
     Scheme,
+    get_catalogue,
     get_scheme,
     get_scheme_flavours,
     get_scheme_modes,
@@ -34,9 +39,14 @@ def register(subparsers):
     set_parser.add_argument("-m", "--mode", choices=["dark", "light"], help="the mode to switch to")
     set_parser.add_argument("-v", "--variant", choices=scheme_variants, help="the variant to switch to")
 
+    warm_parser = scheme_command_subparser.add_parser(
+        "warm", help="precompute dynamic schemes for the wallpaper bucket centroids"
+    )
+
     list_parser.set_defaults(func=run_list)
     get_parser.set_defaults(func=run_get)
     set_parser.set_defaults(func=run_set)
+    warm_parser.set_defaults(func=run_warm)
 
     scheme_parser.set_defaults(func=run_list)
 
@@ -68,30 +78,36 @@ def run_list(args):
             else:
                 print("\n".join(scheme_variants))
     else:
-        current_scheme = get_scheme()
-        schemes = {}
-        for scheme in get_scheme_names():
-            schemes[scheme] = {}
-            for flavour in get_scheme_flavours(scheme):
-                s = Scheme(
-                    {
-                        "name": scheme,
-                        "flavour": flavour,
-                        "mode": current_scheme.mode,
-                        "variant": current_scheme.variant,
-                        "colours": current_scheme.colours,
-                    }
-                )
-                modes = get_scheme_modes(scheme, flavour)
-                if s.mode not in modes:
-                    s._mode = modes[0]
-                try:
-                    s._update_colours()
-                    schemes[scheme][flavour] = s.colours
-                except ValueError:
-                    pass
-
-        print(json.dumps(schemes, indent=2))
+        write_schemes(get_scheme())
+
+
+def iter_schemes(current_scheme: Scheme) -> Iterator[tuple[str, dict[str, dict[str, str]]]]:
+    """Yield (name, {flavour: colours}) for every scheme, in the current mode where available."""
+    catalogue = get_catalogue()
+    for name in get_scheme_names():
+        if name == "dynamic":
+            # Preview for the current wallpaper, computed once in the current variant and mode
+            try:
+                yield name, {"default": get_colours_for_image(scheme=current_scheme)}
+            except FileNotFoundError:
+                yield name, {}
+            continue
+
+        flavours = {}
+        for flavour, modes in catalogue[name].items():
+            if modes:
+                flavours[flavour] = modes.get(current_scheme.mode) or next(iter(modes.values()))
+        yield name, flavours
+
+
+def write_schemes(current_scheme: Scheme) -> None:
+    """Stream the JSON for all schemes one scheme at a time (same layout as `json.dumps(..., indent=2)`)."""
+    sep = "{\n"
+    for name, flavours in iter_schemes(current_scheme):
+        body = json.dumps(flavours, indent=2).replace("\n", "\n  ")
+        sys.stdout.write(f"{sep}  {json.dumps(name)}: {body}")
+        sep = ",\n"
+    sys.stdout.write("\n}\n" if sep != "{\n" else "{}\n")
 
 
 def run_get(args):
@@ -132,3 +148,24 @@ def run_set(args):
         # apply_colours(scheme.colours, scheme.mode)
     else:
         print("No args given. Use --name, --flavour, --mode, --variant or --random to set a scheme")
+
+
+def run_warm(args):
+    import time
+
+    from materialyoucolor.hct import Hct
+
+    from marcyra.utils.material import warm_palettes
+    from marcyra.utils.paths import load_json_or, wallpaper_buckets_manifest_path
+
+    centroids = load_json_or(wallpaper_buckets_manifest_path, {}).get("centroids", {})
+    if not centroids:
+        print("No bucket centroids found. Sort wallpapers first with `marcyra wallpaper --sort`")
+        return
+
+    primaries = {Hct.from_hct(*hct).to_int() for hct in centroids.values()}
+
+    start = time.perf_counter()
+    generated = warm_palettes(primaries)
+    elapsed = time.perf_counter() - start
+    print(f"Warmed schemes for {len(centroids)} centroids ({generated} generated) in {elapsed:.2f}s")
@@ -1,17 +1,28 @@
-import json
-import random
+import signal
+import time
 from collections import defaultdict
 from pathlib import Path
-from typing import Iterable, Optional, Union, Dict, List, Tuple
+from typing import Iterable, Optional, Union, Dict, List
 
-from PIL import Image
 from marcyra.utils.material import get_colours_for_image
 from marcyra.utils.theme import apply_colours
-from materialyoucolor.hct import Hct
-from materialyoucolor.utils.color_utils import argb_from_rgb
 
 from marcyra.utils.scheme import get_scheme
-from marcyra.utils.hypr import message
+from marcyra.utils.hashindex import get_hash_index
+from marcyra.utils.hypr import MONITORS_TTL, connect_events, get_client, get_monitors, read_events
+from marcyra.utils.inotify import (
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_DELETE_SELF,
+    IN_ISDIR,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    Inotify,
+)
+from marcyra.utils.library import IMAGE_SUFFIXES, get_library_index
+from marcyra.utils.logging import log_message
+from marcyra.utils.selection import REPEAT_WINDOW, Selector, load_bucket_map, load_history, toggle_favourite
 from marcyra.utils.paths import (
     compute_hash,
     ensure_dirs,
@@ -27,10 +38,11 @@ from marcyra.utils.paths import (
     image_cache_dir,
     wallpapers_dir,
     wallpaper_buckets_path,
+    wallpaper_favourites_path,
+    wallpaper_state_dir,
 )
-from marcyra.utils.buckets import sort_buckets
 
-VALID_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff"}
+VALID_SUFFIXES = IMAGE_SUFFIXES
 
 # Register Parser and Run
 
@@ -51,6 +63,7 @@ def register(subparsers):
         metavar="OUTPUT",
         help="set the main output used for dynamic scheming",
     )
+    group.add_argument("--favourite", metavar="FILE", help="add or remove FILE from the favourites")
     group.add_argument(
         "-s", "--sort", nargs="?", const=wallpapers_dir, metavar="DIR", help="sort wallpapers into color buckets"
     )
@@ -69,12 +82,40 @@ def register(subparsers):
         metavar="N",
         help="minimum bucket size before merging small clusters (default: 3)",
     )
+    p.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="worker processes for feature extraction when sorting (default: all cores)",
+    )
+    p.add_argument(
+        "--full",
+        action="store_true",
+        help="re-cluster the whole library instead of only adding new or changed images",
+    )
+    p.add_argument(
+        "--drift",
+        type=float,
+        default=0.2,
+        metavar="RATIO",
+        help="share of images added/removed since the last full sort that triggers a re-cluster (default: 0.2)",
+    )
     p.add_argument(
         "--no-symlinks",
         action="store_true",
         help="skip creating/updating symlink directories",
     )
 
+    p.add_argument(
+        "--no-repeat",
+        dest="window",
+        type=int,
+        default=REPEAT_WINDOW,
+        metavar="N",
+        help=f"never pick any of the last N wallpapers shown when random (default: {REPEAT_WINDOW})",
+    )
+
     p.add_argument(
         "-o",
         "--output",
@@ -84,6 +125,29 @@ def register(subparsers):
     )
 
     p.set_defaults(func=run)
+
+    wallpaper_command_subparser = p.add_subparsers(title="subcommands")
+    daemon_parser = wallpaper_command_subparser.add_parser("daemon", help="rotate random wallpapers in the background")
+    daemon_parser.add_argument(
+        "directory", nargs="?", default=wallpapers_dir, help="the wallpaper directory (default: %(default)s)"
+    )
+    daemon_parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=60,
+        metavar="SECONDS",
+        help="seconds between rotations (default: 60)",
+    )
+    daemon_parser.add_argument(
+        "--no-repeat",
+        dest="window",
+        type=int,
+        default=REPEAT_WINDOW,
+        metavar="N",
+        help=f"never pick any of the last N wallpapers shown (default: {REPEAT_WINDOW})",
+    )
+    daemon_parser.set_defaults(func=run_daemon)
     return p
 
 
@@ -101,18 +165,40 @@ def run(args):
         set_random(
             args.random,
             outputs=getattr(args, "output", None),
+            window=args.window,
         )
-
+    elif args.favourite:
+        wall = Path(args.favourite).expanduser()
+        if not is_valid_image(wall):
+            raise ValueError(f'"{wall}" is not a valid image')
+        state = "added to" if toggle_favourite(wall) else "removed from"
+        print(f"[info] {wall.resolve()} {state} favourites")
     elif args.sort:
+        from marcyra.utils.buckets import sort_buckets
+
         sort_buckets(
             directory=args.sort,
             update_symlinks=not args.no_symlinks,
             min_size=args.min_size,
+            jobs=args.jobs,
+            full=args.full,
+            drift=args.drift,
         )
     else:
         print_wallpaper_report()
 
 
+def run_daemon(args):
+    import asyncio
+
+    ensure_dirs()
+    root = Path(args.directory).expanduser().resolve()
+    if not root.is_dir():
+        raise ValueError(f'"{root}" is not a directory')
+
+    asyncio.run(WallpaperDaemon(root, args.interval, args.window).run())
+
+
 # -------- Files & JSON --------
 
 
@@ -135,10 +221,6 @@ def save_thumbs_map(mapping: Dict[str, str]) -> None:
 # -------- Hyprland --------
 
 
-def get_monitors() -> List[dict]:
-    return message("monitors")  # IPC JSON
-
-
 def list_output_names() -> List[str]:
     return [m["name"] for m in get_monitors()]
 
@@ -162,80 +244,8 @@ def is_valid_image(path: Path) -> bool:
 
 
 def iter_wallpapers(root: Path) -> List[Path]:
-    # De-duplicate by resolved string once
-    seen: Dict[str, Path] = {}
-    for p in root.rglob("*"):
-        if p.suffix.lower() in VALID_SUFFIXES and p.is_file():
-            rp = str(p.resolve())
-            if rp not in seen:
-                seen[rp] = p.resolve()
-    return list(seen.values())
-
-
-def get_smart_options(wall: Path, cache: Path) -> Dict[str, str]:
-    options_cache = cache / "smart.json"
-    try:
-        return json.loads(options_cache.read_text(encoding="utf-8"))
-    except Exception:
-        pass
-
-    from marcyra.utils.colourfulness import get_variant
-
-    # Use the 128x128 thumb to avoid decoding full image again
-    thumb = get_thumb(wall, cache)
-    options: Dict[str, str] = {}
-    with Image.open(thumb) as img:
-        options["variant"] = get_variant(img)
-        # 1x1 to probe light/dark tone cheaply
-        options["mode"] = "dark"
-        # tiny = img.copy()
-        # tiny.thumbnail((1, 1), Image.LANCZOS)
-        # hct = Hct.from_int(argb_from_rgb(*tiny.getpixel((0, 0))))
-        # options["mode"] = "light" if hct.tone > 200 else "dark"
-
-    options_cache.parent.mkdir(parents=True, exist_ok=True)
-    options_cache.write_text(json.dumps(options), encoding="utf-8")
-    return options
-
-
-# -------- Selection policy --------
-
-
-def choose_for_targets(
-    targets: List[str],
-    candidates: List[Path],
-    current_map: Dict[str, str],
-) -> Dict[str, Path]:
-    # Avoid currently used images globally first
-    used = set(current_map.values())
-    fresh_pool = [p for p in candidates if str(p) not in used]
-    chosen: Dict[str, Path] = {}
-
-    if len(fresh_pool) >= len(targets):
-        picks = random.sample(fresh_pool, len(targets))
-        for out, wall in zip(targets, picks):
-            chosen[out] = wall
-        return chosen
-
-    # Greedy assign all fresh first
-    remaining = targets[:]
-    random.shuffle(fresh_pool)
-    for wall in fresh_pool:
-        if not remaining:
-            break
-        chosen[remaining.pop()] = wall
-
-    # Fill rest by avoiding each-output current and already-chosen
-    pool_all = candidates[:]
-    random.shuffle(pool_all)
-    assigned = {str(p) for p in chosen.values()}
-    for out in remaining:
-        avoid = {current_map.get(out, "")} | assigned
-        options = [p for p in pool_all if str(p) not in avoid]
-        pick = random.choice(options if options else pool_all)
-        chosen[out] = pick
-        assigned.add(str(pick))
-    return chosen
+    # Resolved and de-duplicated; unchanged directories are not listed again
+    return get_library_index().scan(root)
 
 
 # -------- Main-output helpers --------
@@ -271,6 +281,8 @@ def set_main_output(output: str) -> None:
 
     scheme = get_scheme()
     if scheme.name == "dynamic":
+        from marcyra.utils.colourfulness import get_smart_options
+
         smart = get_smart_options(wall, image_cache_dir(wall))
         scheme.mode = smart["mode"]
         scheme.variant = smart["variant"]
@@ -281,17 +293,30 @@ def set_main_output(output: str) -> None:
 # -------- Wall application --------
 
 
-def apply_wallpapers(assignments: Dict[str, Path]) -> None:
-    # 1) Update both JSON maps atomically (each its own atomic write)
-    out_map = load_outputs_map()
+def apply_wallpapers(
+    assignments: Dict[str, Path],
+    out_map: Optional[Dict[str, str]] = None,
+    thumbs_map: Optional[Dict[str, str]] = None,
+) -> None:
+    # 1) Update both JSON maps atomically (each its own atomic write).
+    # Long-running callers pass their in-memory maps, which are updated in place.
+    if out_map is None:
+        out_map = load_outputs_map()
     out_map.update({out: str(p) for out, p in assignments.items()})
     save_outputs_map(out_map)
 
-    thumbs_map = load_thumbs_map()
+    history = load_history()
+    for wall in dict.fromkeys(str(p) for p in assignments.values()):
+        history.push(wall)
+    history.save()
+
+    if thumbs_map is None:
+        thumbs_map = load_thumbs_map()
+    from marcyra.utils.extract import ensure_ingested
+
+    # New images are decoded once for thumbnail, smart options and score together
     for out, p in assignments.items():
-        cache = wallpapers_cache_dir / compute_hash(p)
-        thumb = get_thumb(p, cache)
-        thumbs_map[out] = str(thumb)
+        thumbs_map[out] = str(wallpapers_cache_dir / ensure_ingested(p) / "thumbnail.jpg")
     save_thumbs_map(thumbs_map)
 
     # 2) If main output is part of the change, update the single symlink and scheme once
@@ -305,6 +330,8 @@ def apply_wallpapers(assignments: Dict[str, Path]) -> None:
         safe_symlink(wallpaper_thumbnail_path, thumb_path)
 
         if scheme.name == "dynamic":
+            from marcyra.utils.colourfulness import get_smart_options
+
             smart = get_smart_options(Path(out_map[main]), image_cache_dir(out_map[main]))
             scheme.mode = smart["mode"]
             scheme.variant = smart["variant"]
@@ -315,8 +342,11 @@ def apply_wallpapers(assignments: Dict[str, Path]) -> None:
 # -------- Public API --------
 
 
-## TODO: Look over this code. Try to improve random selection. For example avoid selecting the same wallpaper twice.
-def set_random(directory: Optional[Union[str, Path]] = None, outputs: Optional[Iterable[str]] = None) -> None:
+def set_random(
+    directory: Optional[Union[str, Path]] = None,
+    outputs: Optional[Iterable[str]] = None,
+    window: int = REPEAT_WINDOW,
+) -> None:
     ensure_dirs()
     root = Path(directory or wallpapers_dir).expanduser().resolve()
     if not root.is_dir():
@@ -330,45 +360,7 @@ def set_random(directory: Optional[Union[str, Path]] = None, outputs: Optional[I
     if not candidates:
         raise ValueError(f'No wallpapers found under "{root}"')
 
-    # Load color buckets (if they exist)
-    bucket_map = load_json_or(wallpaper_buckets_path, {})
-    inverse_buckets: Dict[str, List[Path]] = defaultdict(list)
-    for bucket_id, walls in bucket_map.items():
-        for w in walls:
-            inverse_buckets[str(Path(w).resolve())].append(bucket_id)
-
-    # Pick a random wallpaper
-    first_wall = random.choice(candidates)
-    chosen_bucket = None
-    related_candidates: List[Path] = []
-
-    if str(first_wall.resolve()) in inverse_buckets:
-        # Get the first bucket this wallpaper belongs to
-        bucket_id = inverse_buckets[str(first_wall.resolve())][0]
-        same_bucket = [Path(w).resolve() for w in bucket_map[bucket_id]]
-        # Filter out the same file
-        related_candidates = [w for w in same_bucket if w != first_wall]
-        chosen_bucket = bucket_id
-
-    # If bucket empty or missing, fallback to full random set
-    if not related_candidates:
-        related_candidates = [w for w in candidates if w != first_wall]
-
-    # Build wallpaper selection for all outputs
-    num_needed = len(targets)
-    selection_pool = [first_wall] + random.sample(related_candidates, k=min(len(related_candidates), num_needed - 1))
-    random.shuffle(selection_pool)
-
-    chosen: Dict[str, Path] = {}
-    for out, wall in zip(targets, selection_pool):
-        chosen[out] = wall
-
-    # If we still need more wallpapers (fewer candidates than outputs), fill randomly
-    while len(chosen) < num_needed:
-        wall = random.choice(candidates)
-        if wall not in chosen.values():
-            next_out = [o for o in targets if o not in chosen][0]
-            chosen[next_out] = wall
+    chosen, chosen_bucket = Selector(candidates, load_bucket_map()).choose(targets, load_history(), window)
 
     print(f"[info] selected {len(chosen)} wallpapers")
     if chosen_bucket:
@@ -390,6 +382,197 @@ def set_wallpaper(wall: Union[Path, str], outputs: Optional[Iterable[str]] = Non
     apply_wallpapers(chosen)
 
 
+# -------- Daemon --------
+
+
+class WallpaperDaemon:
+    """Resident wallpaper rotation, replacing a shell loop around `wallpaper -r`.
+
+    The candidate list, bucket inverse index and output maps are kept in memory and
+    updated from inotify events instead of rescanning the tree on every rotation.
+    Monitor hotplug comes from Hyprland's event socket: new outputs get a wallpaper
+    straight away and the `monitors` reply is only re-queried after a change.
+    """
+
+    def __init__(self, root: Path, interval: float, window: int = REPEAT_WINDOW) -> None:
+        self.root = root
+        self.interval = interval
+        self.window = window
+        self.library = get_library_index()
+        self.candidates: List[Path] = []
+        self.bucket_map = load_bucket_map()
+        self._selector: Optional[Selector] = None  # rebuilt when candidates, buckets or favourites change
+        self.out_map = load_outputs_map()
+        self.thumbs_map = load_thumbs_map()
+        self.inotify: Optional[Inotify] = None
+
+    def scan(self) -> None:
+        # Only directories whose mtime moved since the last scan are listed again
+        self.candidates = self.library.scan(self.root)
+        self._selector = None
+
+    @property
+    def selector(self) -> Selector:
+        if self._selector is None:
+            self._selector = Selector(self.candidates, self.bucket_map)
+        return self._selector
+
+    def _on_fs_events(self) -> None:
+        changed = False
+        for path, mask in self.inotify.read():
+            if path is None:
+                # Kernel queue overflowed, events were lost
+                changed = True
+                continue
+
+            if path.parent == wallpaper_state_dir:
+                if path == wallpaper_buckets_path:
+                    self.bucket_map = load_bucket_map()
+                    self._selector = None
+                elif path == wallpaper_favourites_path:
+                    self._selector = None
+                elif path == wallpaper_map_path:
+                    self.out_map = load_outputs_map()
+                elif path == thumbs_map_path:
+                    self.thumbs_map = load_thumbs_map()
+                continue
+
+            if mask & (IN_ISDIR | IN_DELETE_SELF):
+                changed = changed or bool(mask & (IN_CREATE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF))
+            elif path.suffix.lower() in VALID_SUFFIXES:
+                # New files count once fully written
+                changed = changed or bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM))
+
+        if changed:
+            self.scan()
+
+    def rotate(self) -> None:
+        start = time.perf_counter()
+
+        targets = resolve_outputs(None)
+        if not targets or not self.candidates:
+            return
+
+        chosen, chosen_bucket = self.selector.choose(targets, load_history(), self.window)
+        apply_wallpapers(chosen, self.out_map, self.thumbs_map)
+        get_hash_index().save()
+        self.library.save()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        bucket = f" from bucket {chosen_bucket}" if chosen_bucket else ""
+        log_message(f"Rotated {len(chosen)} outputs{bucket} in {elapsed:.1f} ms")
+
+        from marcyra.utils.cachegc import auto_collect
+
+        auto_collect()
+
+    def assign(self, targets: List[str]) -> None:
+        """Give outputs without a wallpaper one, avoiding recently shown ones."""
+        targets = [out for out in targets if out not in self.out_map]
+        if not targets or not self.candidates:
+            return
+
+        chosen, _ = self.selector.choose(targets, load_history(), self.window)
+        apply_wallpapers(chosen, self.out_map, self.thumbs_map)
+        get_hash_index().save()
+        log_message(f"Assigned wallpapers to {', '.join(chosen)}")
+
+    def remove(self, output: str) -> None:
+        """Forget a disconnected output; the main output moves to another one if it was it."""
+        self.out_map.pop(output, None)
+        self.thumbs_map.pop(output, None)
+        save_outputs_map(self.out_map)
+        save_thumbs_map(self.thumbs_map)
+
+        remaining = list_output_names()
+        if is_main_output(output) and remaining:
+            set_main_output(remaining[0])
+            log_message(f"Main output {output} removed, using {remaining[0]}")
+
+    def on_hypr_event(self, event: str, data: str) -> None:
+        if event == "monitoradded":
+            get_client().invalidate()
+            self.assign([data])
+        elif event == "monitorremoved":
+            get_client().invalidate()
+            self.remove(data)
+        elif event in ("workspace", "focusedmon"):
+            # The cached reply carries each monitor's active workspace and focus
+            get_client().invalidate()
+
+    async def listen(self) -> None:
+        """Follow Hyprland's event socket, reconnecting with backoff when it goes away."""
+        import asyncio
+
+        client = get_client()
+        delay = 1.0
+        while True:
+            try:
+                reader, writer = await connect_events()
+            except OSError as e:
+                log_message(f"Hyprland event socket unavailable ({e}), retrying in {delay:g}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+                continue
+
+            # Events keep the monitors cache fresh; catch up on changes missed while disconnected
+            delay = 1.0
+            client.monitors_ttl = float("inf")
+            client.invalidate()
+            try:
+                try:
+                    self.assign(list_output_names())
+                except Exception as e:
+                    log_message(f"Assigning wallpapers to new outputs failed: {e}")
+                async for event, data in read_events(reader):
+                    try:
+                        self.on_hypr_event(event, data)
+                    except Exception as e:
+                        log_message(f"Handling {event}>>{data} failed: {e}")
+                log_message("Hyprland event socket closed")
+            except OSError as e:
+                log_message(f"Hyprland event socket error: {e}")
+            except Exception as e:
+                # Keep following events whatever went wrong; back off in case it repeats
+                log_message(f"Hyprland event listener failed: {e}, reconnecting in {delay:g}s")
+                await asyncio.sleep(delay)
+            finally:
+                client.monitors_ttl = MONITORS_TTL
+                writer.close()
+
+    async def run(self) -> None:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in signal.SIGINT, signal.SIGTERM:
+            loop.add_signal_handler(sig, stop.set)
+
+        self.inotify = Inotify()
+        self.inotify.add_tree(self.root)
+        self.inotify.add_watch(wallpaper_state_dir, IN_CLOSE_WRITE | IN_MOVED_TO)
+        loop.add_reader(self.inotify.fileno(), self._on_fs_events)
+
+        self.scan()
+        log_message(f"Watching {len(self.candidates)} wallpapers under {self.root}, rotating every {self.interval:g}s")
+        listener = asyncio.create_task(self.listen())
+
+        try:
+            while not stop.is_set():
+                try:
+                    self.rotate()
+                except Exception as e:
+                    log_message(f"Rotation failed: {e}")
+                try:
+                    await asyncio.wait_for(stop.wait(), self.interval)
+                except TimeoutError:
+                    pass
+        finally:
+            listener.cancel()
+            loop.remove_reader(self.inotify.fileno())
+            self.inotify.close()
+
+
 # ------- Reporting -------
 
 
@@ -407,6 +590,8 @@ def render_swatch(hexval: str, width: int = 6) -> str:
 
 
 def print_wallpaper_report() -> None:
+    from marcyra.utils.colourfulness import get_smart_options
+
     mapping = load_outputs_map()
     if not mapping:
         print("No wallpapers set")
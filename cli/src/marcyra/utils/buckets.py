@@ -10,8 +10,18 @@ from sklearn.cluster import KMeans
 from sklearn.mixture import GaussianMixture
 from sklearn.metrics import silhouette_score
 
-from marcyra.utils.paths import pictures_dir, wallpaper_buckets_path, image_cache_dir
-from marcyra.utils.material import get_score_for_image
+from marcyra.utils.cachegc import auto_collect
+from marcyra.utils.extract import extract_features
+from marcyra.utils.hashindex import get_hash_index
+from marcyra.utils.library import get_library_index
+from marcyra.utils.paths import (
+    atomic_dump,
+    compute_hash,
+    load_json_or,
+    pictures_dir,
+    wallpaper_buckets_manifest_path,
+    wallpaper_buckets_path,
+)
 
 CLUSTER_METHODS = ["kmeans", "gmm", "agglomerative", "dbscan", "spectral", "quantize"]
 
@@ -32,7 +42,17 @@ def sort_buckets(
     directory: Optional[Union[str, Path]] = None,
     update_symlinks: bool = True,
     min_size: int = 5,
+    jobs: Optional[int] = None,
+    full: bool = False,
+    drift: float = 0.2,
 ):
+    """Sort wallpapers into colour buckets.
+
+    By default only images that are new or changed since the last run are extracted and
+    assigned to the nearest saved bucket centroid, and deleted images are dropped. A full
+    re-cluster runs when `full` is set, when there is no manifest yet, or when the share of
+    images added/removed since the last full fit exceeds `drift`.
+    """
     directory = Path(directory or pictures_dir)
     print("Sorting:", directory)
 
@@ -41,15 +61,93 @@ def sort_buckets(
         print("No images found.")
         return
 
-    # Extract HCT features
-    data = []
+    manifest = load_json_or(wallpaper_buckets_manifest_path, {})
+    known: dict[str, dict] = manifest.get("images", {})
+    centroids: dict[str, list[float]] = manifest.get("centroids", {})
+
+    # Split the library into unchanged images (features reused from the manifest) and
+    # new or modified ones (hash index miss or different digest)
+    index = get_hash_index()
+    features: dict[str, dict] = {}
+    pending: list[Path] = []
     for p in images:
-        cache_base = image_cache_dir(p)
-        primary = get_score_for_image(p, cache_base)
-        data.append([primary.hue, primary.chroma, primary.tone])
+        key = str(p.resolve())
+        entry = known.get(key)
+        if entry and index.lookup(p) == entry["hash"]:
+            features[key] = entry
+        else:
+            pending.append(p)
+    library = {str(p.resolve()) for p in images}
+    removed = [key for key in known if key not in library]
+
+    # Pending images are new, modified, or only touched (same hash, nothing to redo)
+    new: list[str] = []
+    modified: list[str] = []
+    if pending:
+        X_new = extract_features(pending, jobs)
+        for p, row in zip(pending, X_new):
+            key = str(p.resolve())
+            digest = compute_hash(p)
+            if key not in known:
+                new.append(key)
+            elif known[key]["hash"] != digest:
+                modified.append(key)
+            features[key] = {"hash": digest, "features": row.tolist()}
+
+    changed = manifest.get("changed", 0) + len(new) + len(modified) + len(removed)
+    fitted = manifest.get("fitted", 0)
+    if full or not centroids or not fitted or changed / fitted > drift:
+        if not full and fitted:
+            print(f"Drift {changed / fitted:.0%} exceeds {drift:.0%}, re-clustering")
+        buckets = cluster_buckets(features, min_size)
+        fitted, changed = len(features), 0
+        added, dropped = None, None
+    else:
+        buckets = load_json_or(wallpaper_buckets_path, {})
+        # Modified images leave their old bucket and are assigned again like new ones
+        dropped = set(removed) | set(modified)
+        for bucket, walls in buckets.items():
+            buckets[bucket] = [w for w in walls if w not in dropped]
+
+        added: dict[str, list[str]] = {}
+        for key in new + modified:
+            feats = np.array(features[key]["features"])
+            bucket = min(centroids, key=lambda b: hct_distance(feats, np.array(centroids[b])))
+            buckets.setdefault(bucket, []).append(key)
+            added.setdefault(bucket, []).append(key)
+        print(
+            f"Added {len(new)}, updated {len(modified)} and removed {len(removed)} images "
+            f"(drift {changed / fitted:.0%})"
+        )
+
+    # Centroids are only refitted on a full re-cluster so incremental additions stay stable
+    if added is None:
+        centroids = {
+            bucket: np.mean([features[w]["features"] for w in walls], axis=0).tolist()
+            for bucket, walls in buckets.items()
+            if walls
+        }
+    atomic_dump(
+        wallpaper_buckets_manifest_path,
+        {"fitted": fitted, "changed": changed, "centroids": centroids, "images": features},
+    )
+
+    # Save and refresh symlinks
+    buckets = save_buckets(buckets, wallpaper_buckets_path)
+
+    if update_symlinks:
+        out_dir = pictures_dir / "bucket_out"
+        if added is None or not out_dir.exists():
+            refresh_symlinks(buckets, out_dir)
+        else:
+            update_symlinks_in_place(out_dir, added, dropped)
+
+    auto_collect()
 
-    X = np.array(data)
-    from sklearn.mixture import GaussianMixture
+
+def cluster_buckets(features: dict[str, dict], min_size: int) -> dict[str, list[str]]:
+    paths = list(features)
+    X = np.array([features[p]["features"] for p in paths])
 
     # Auto-select cluster count using BIC
     lowest_bic = np.inf
@@ -67,34 +165,22 @@ def sort_buckets(
 
     # Group wallpapers
     buckets = {}
-    for lbl, p in zip(labels, images):
-        buckets.setdefault(str(lbl), []).append(str(p.resolve()))
+    for lbl, p in zip(labels, paths):
+        buckets.setdefault(str(lbl), []).append(p)
 
     # Merge small clusters
-    buckets = merge_small_clusters(buckets, X, labels, min_size)
-
-    # Save and refresh symlinks
-    buckets = save_buckets(buckets, wallpaper_buckets_path)
-
-    if update_symlinks:
-        out_dir = pictures_dir / "bucket_out"
-        refresh_symlinks(buckets, out_dir)
+    return merge_small_clusters(buckets, X, labels, min_size)
 
 
 def collect_images(directory: Path) -> list[Path]:
-    images = sorted([f for f in directory.rglob("*") if f.suffix.lower() in (".jpg", ".png", ".jpeg")])
+    images = sorted(get_library_index().scan(directory))
 
     print(f"Found {len(images)} images")
-    for img_path in images[:]:
-        try:
-            with Image.open(img_path) as im:
-                print(img_path.name, im.size, im.mode)
-        except Exception as e:
-            print("Failed to open", img_path, e)
     return images
 
 
 def save_buckets(buckets, out_json: Path) -> dict:
+    out_json.parent.mkdir(parents=True, exist_ok=True)
     with open(out_json, "w") as f:
         json.dump(buckets, f, indent=2)
     return buckets
@@ -121,6 +207,24 @@ def refresh_symlinks(buckets: dict, out_dir: Path):
                 os.symlink(target, link)
 
 
+def update_symlinks_in_place(out_dir: Path, added: dict[str, list[str]], removed: set[str]):
+    if removed:
+        for bucket in out_dir.iterdir():
+            if bucket.is_dir():
+                for link in bucket.iterdir():
+                    if link.is_symlink() and os.readlink(link) in removed:
+                        link.unlink()
+
+    for bucket, files in added.items():
+        d = out_dir / bucket
+        d.mkdir(exist_ok=True)
+        for f in files:
+            target = Path(f).resolve()
+            link = d / target.name
+            if not link.exists():
+                os.symlink(target, link)
+
+
 def merge_small_clusters(buckets, data, labels, min_size):
     centroids = cluster_centroids(buckets, data, labels)
     merged = True
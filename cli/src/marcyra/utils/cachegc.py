@@ -0,0 +1,146 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+from marcyra.utils.cachestore import get_cache_store
+from marcyra.utils.hashindex import get_hash_index
+from marcyra.utils.logging import log_message
+from marcyra.utils.paths import load_json_or, thumbs_map_path, wallpapers_cache_dir
+
+# Optional automatic policy, applied at most once per AUTO_GC_INTERVAL by long-running
+# or cache-heavy commands (sort, daemon). Unset means unlimited.
+MAX_SIZE_ENV = "MARCYRA_CACHE_MAX_SIZE"  # e.g. 500M, 2G
+MAX_AGE_ENV = "MARCYRA_CACHE_MAX_AGE"  # days since last use
+AUTO_GC_INTERVAL = 24 * 60 * 60
+ROW_BYTES = 128  # rough per-image row cost in the store
+
+_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_size(text: str) -> int:
+    """Parse `500M`, `2G`, `100K`, `1.5GiB` or a plain byte count."""
+    value = text.strip().upper().removesuffix("IB").removesuffix("B")
+    unit = value[-1:] if value[-1:] in _UNITS else ""
+    try:
+        return int(float(value.removesuffix(unit)) * _UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Invalid size: {text!r}") from None
+
+
+def policy_from_env() -> tuple[int | None, float | None]:
+    """`(max_bytes, max_age_seconds)` from the environment; None where unset."""
+    size = os.getenv(MAX_SIZE_ENV)
+    age = os.getenv(MAX_AGE_ENV)
+    return (parse_size(size) if size else None, float(age) * 86400 if age else None)
+
+
+def collect(
+    max_bytes: int | None = None,
+    max_age: float | None = None,
+    orphans: bool = True,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    """Remove cached images and scheme records; returns counts and the bytes reclaimed.
+
+    Entries go when every indexed file with their hash is gone (`orphans`; hashes the index
+    never saw are kept), when they were last used more than `max_age` seconds ago, and then
+    least recently used first until the cache fits in `max_bytes`. Sizes and access times
+    come from the cache store, so only thumbnail directories the store does not know yet
+    are stat-ed. Thumbnails of the wallpapers currently on screen are never removed.
+    Templates and Discord css have their own limits.
+    """
+    store = get_cache_store()
+    now = time.time()
+
+    orphaned = get_hash_index().prune(dry_run)
+    protected = {Path(thumb).parent.name for thumb in load_json_or(thumbs_map_path, {}).values()}
+
+    # (accessed, bytes) per image hash and per scheme record
+    images: dict[str, tuple[float, int]] = {}
+    unsized: set[str] = set()
+    derived: dict[str, list[str]] = {}
+    for digest, accessed, thumb, source in store.image_entries():
+        images[digest] = (accessed, (thumb or 0) + ROW_BYTES)
+        if thumb is None:
+            unsized.add(digest)
+        if source is not None:
+            derived.setdefault(source, []).append(digest)
+
+    # Thumbnail directories that predate size tracking are measured once and remembered
+    if wallpapers_cache_dir.is_dir():
+        for entry in os.scandir(wallpapers_cache_dir):
+            if entry.name in images and entry.name not in unsized:
+                continue
+            try:
+                st = os.stat(os.path.join(entry.path, "thumbnail.jpg"))
+            except OSError:
+                continue
+            accessed = images[entry.name][0] if entry.name in images else st.st_mtime
+            images[entry.name] = (accessed, st.st_size + ROW_BYTES)
+            if not dry_run:
+                store.record_thumb(entry.name, st.st_size, accessed)
+    palettes = {primary: (accessed, size) for primary, accessed, size in store.palette_entries()}
+
+    doomed: set[str] = set()
+    if orphans:
+        doomed |= {digest for digest in images if digest in orphaned}
+    if max_age is not None:
+        doomed |= {digest for digest, (accessed, _) in images.items() if accessed < now - max_age}
+    doomed -= protected
+    stale = {p for p, (accessed, _) in palettes.items() if max_age is not None and accessed < now - max_age}
+
+    if max_bytes is not None:
+        total = sum(size for d, (_, size) in images.items() if d not in doomed)
+        total += sum(size for p, (_, size) in palettes.items() if p not in stale)
+        candidates = [(accessed, "image", d, size) for d, (accessed, size) in images.items() if d not in doomed]
+        candidates += [(accessed, "palette", p, size) for p, (accessed, size) in palettes.items() if p not in stale]
+        for _, kind, key, size in sorted(candidates):
+            if total <= max_bytes:
+                break
+            if kind == "palette":
+                stale.add(key)
+            elif key not in protected:
+                doomed.add(key)
+            else:
+                continue
+            total -= size
+
+    # Rows derived from a removed image (its thumbnail's score) go with it
+    doomed |= {d for parent in list(doomed) for d in derived.get(parent, ())} - protected
+
+    if dry_run:
+        reclaimed = sum(images[d][1] for d in doomed) + sum(palettes[p][1] for p in stale)
+    elif doomed or stale:
+        before = store.size()
+        reclaimed = sum(images[d][1] - ROW_BYTES for d in doomed)
+        for digest in doomed:
+            shutil.rmtree(wallpapers_cache_dir / digest, ignore_errors=True)
+        store.delete_images(sorted(doomed))
+        store.delete_palettes(sorted(stale))
+        store.vacuum()
+        reclaimed += max(0, before - store.size())
+    else:
+        reclaimed = 0
+
+    return {"images": len(doomed), "palettes": len(stale), "bytes": reclaimed}
+
+
+def auto_collect() -> None:
+    """Apply the environment policy if one is set and the last automatic run is older than a day."""
+    max_bytes, max_age = policy_from_env()
+    if max_bytes is None and max_age is None:
+        return
+
+    store = get_cache_store()
+    last = store.get_meta("last_gc")
+    if last is not None and time.time() - float(last) < AUTO_GC_INTERVAL:
+        return
+
+    report = collect(max_bytes, max_age)
+    store.set_meta("last_gc", str(time.time()))
+    if report["images"] or report["palettes"]:
+        log_message(
+            f"Cache gc: removed {report['images']} images and {report['palettes']} schemes, "
+            f"reclaimed {report['bytes'] / 1024:.0f} KiB"
+        )
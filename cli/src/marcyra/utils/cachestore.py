@@ -0,0 +1,347 @@
+import json
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+
+from marcyra.utils.logging import log_debug
+from marcyra.utils.paths import cache_db_path, palette_cache_dir, scheme_cache_dir, wallpapers_cache_dir
+
+MMAP_SIZE = 64 * 1024 * 1024
+PALETTE_MAX_ENTRIES = 2048  # ~8 KiB each when packed
+ACCESS_RESOLUTION = 60.0  # seconds; reads refresh `accessed` at most this often
+SMART_VERSION = "2"  # bump when utils/colourfulness.py classifies differently; stored options are recomputed
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS images (
+    hash TEXT PRIMARY KEY,
+    score INTEGER,
+    mode TEXT,
+    variant TEXT,
+    thumb_bytes INTEGER,
+    source TEXT,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS palettes (
+    primary_rgb INTEGER PRIMARY KEY,
+    colours BLOB NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS palettes_accessed ON palettes (accessed);
+"""
+MODES = ("dark", "light")
+
+
+class CacheStore:
+    """Single sqlite file holding per-image scores and smart options and per-primary scheme records.
+
+    Images are keyed by content hash. A scheme record is stored as one blob of packed
+    24-bit colours (variant-major, then mode, then colour name) whose layout is kept
+    once in `meta`, so every lookup is a single primary-key probe on a memory-mapped file.
+    Thumbnails stay as files because other programs read them by path; their sizes are
+    recorded here. Rows derived from another image (a thumbnail's own score) name it as
+    their `source` and are collected with it. Reads refresh `accessed` so garbage collection can work from the store
+    alone (see `utils/cachegc.py`).
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.pid = os.getpid()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        self.db.executescript(SCHEMA)
+        self._layout: dict | None = None
+
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(images)")}
+        for column, kind in ("thumb_bytes", "INTEGER"), ("source", "TEXT"):
+            if column not in columns:
+                try:
+                    self.db.execute(f"ALTER TABLE images ADD COLUMN {column} {kind}")
+                except sqlite3.OperationalError:
+                    pass  # Added concurrently by another process
+
+        if self.get_meta("migrated") is None:
+            self.migrate()
+        if self.get_meta("smart_version") != SMART_VERSION:
+            self.db.execute("UPDATE images SET mode = NULL, variant = NULL")
+            self.set_meta("smart_version", SMART_VERSION)
+
+    def get_meta(self, key: str) -> str | None:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    # Images
+
+    def get_score(self, digest: str) -> int | None:
+        row = self.db.execute("SELECT score FROM images WHERE hash = ?", (digest,)).fetchone()
+        if row and row[0] is not None:
+            self.touch_images([digest])
+            return row[0]
+        return None
+
+    def get_scores(self, digests: list[str]) -> dict[str, int]:
+        """Scores for many hashes at once; hashes without a cached score are left out."""
+        scores = {}
+        for i in range(0, len(digests), 500):
+            chunk = digests[i : i + 500]
+            rows = self.db.execute(
+                f"SELECT hash, score FROM images WHERE score IS NOT NULL AND hash IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            scores.update(rows)
+        self.touch_images(list(scores))
+        return scores
+
+    def set_score(self, digest: str, argb: int) -> None:
+        self.db.execute(
+            "INSERT INTO images (hash, score, accessed) VALUES (?, ?, ?) "
+            "ON CONFLICT (hash) DO UPDATE SET score = excluded.score, accessed = excluded.accessed",
+            (digest, argb, time.time()),
+        )
+
+    def get_smart(self, digest: str) -> dict[str, str] | None:
+        row = self.db.execute("SELECT mode, variant FROM images WHERE hash = ?", (digest,)).fetchone()
+        if not row or row[0] is None:
+            return None
+        self.touch_images([digest])
+        return {"variant": row[1], "mode": row[0]}
+
+    def get_smarts(self, digests: list[str]) -> dict[str, dict[str, str]]:
+        """Smart options for many hashes at once; hashes without them are left out."""
+        options = {}
+        for i in range(0, len(digests), 500):
+            chunk = digests[i : i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.db.execute(
+                f"SELECT hash, mode, variant FROM images WHERE mode IS NOT NULL AND hash IN ({placeholders})", chunk
+            )
+            options.update((digest, {"variant": variant, "mode": mode}) for digest, mode, variant in rows)
+        self.touch_images(list(options))
+        return options
+
+    def set_smart(self, digest: str, options: dict[str, str]) -> None:
+        self.db.execute(
+            "INSERT INTO images (hash, mode, variant, accessed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (hash) DO UPDATE SET mode = excluded.mode, variant = excluded.variant, "
+            "accessed = excluded.accessed",
+            (digest, options["mode"], options["variant"], time.time()),
+        )
+
+    def record_thumb(self, digest: str, size: int, accessed: float | None = None) -> None:
+        self.db.execute(
+            "INSERT INTO images (hash, thumb_bytes, accessed) VALUES (?, ?, ?) "
+            "ON CONFLICT (hash) DO UPDATE SET thumb_bytes = excluded.thumb_bytes",
+            (digest, size, accessed or time.time()),
+        )
+
+    def put_images(self, rows: list[tuple[str, int | None, dict[str, str] | None, int | None, str | None]]) -> None:
+        """Upsert `(hash, score, smart options, thumb bytes, source)` rows in one transaction.
+
+        None keeps a stored field.
+        """
+        now = time.time()
+        self.db.execute("BEGIN")
+        self.db.executemany(
+            "INSERT INTO images (hash, score, mode, variant, thumb_bytes, source, accessed) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (hash) DO UPDATE SET score = coalesce(excluded.score, score), "
+            "mode = coalesce(excluded.mode, mode), variant = coalesce(excluded.variant, variant), "
+            "thumb_bytes = coalesce(excluded.thumb_bytes, thumb_bytes), "
+            "source = coalesce(excluded.source, source), accessed = excluded.accessed",
+            [
+                (digest, argb, options and options["mode"], options and options["variant"], thumb, source, now)
+                for digest, argb, options, thumb, source in rows
+            ],
+        )
+        self.db.execute("COMMIT")
+
+    def touch_images(self, digests: list[str]) -> None:
+        """Mark images as used; rows touched within `ACCESS_RESOLUTION` are left alone."""
+        now = time.time()
+        for i in range(0, len(digests), 500):
+            chunk = digests[i : i + 500]
+            self.db.execute(
+                f"UPDATE images SET accessed = ? WHERE accessed < ? AND hash IN ({','.join('?' * len(chunk))})",
+                (now, now - ACCESS_RESOLUTION, *chunk),
+            )
+
+    # Scheme records
+
+    def _get_layout(self) -> dict | None:
+        if self._layout is None:
+            layout = self.get_meta("palette_layout")
+            self._layout = json.loads(layout) if layout else None
+        return self._layout
+
+    def get_palette(self, primary: int) -> dict | None:
+        """Return `{"names": [...], "schemes": {variant: {mode: [hex, ...]}}}` for a primary, if cached."""
+        layout = self._get_layout()
+        row = self.db.execute("SELECT colours FROM palettes WHERE primary_rgb = ?", (primary & 0xFFFFFF,)).fetchone()
+        if layout is None or row is None:
+            return None
+
+        names, variants = layout["names"], layout["variants"]
+        flat = row[0].hex()
+        stride = len(names) * 6
+        schemes: dict[str, dict[str, list[str]]] = {}
+        offset = 0
+        for variant in variants:
+            schemes[variant] = {}
+            for mode in MODES:
+                block = flat[offset : offset + stride]
+                schemes[variant][mode] = [block[i : i + 6] for i in range(0, stride, 6)]
+                offset += stride
+        return {"names": names, "schemes": schemes}
+
+    def set_palette(self, primary: int, record: dict) -> None:
+        names, schemes = record["names"], record["schemes"]
+        layout = {"names": names, "variants": list(schemes)}
+        if layout != self._get_layout():
+            # The generator's output changed shape: records in the old layout are unreadable
+            self.db.execute("DELETE FROM palettes")
+            self.set_meta("palette_layout", json.dumps(layout))
+            self._layout = layout
+
+        blob = bytes.fromhex("".join(c for variant in schemes.values() for mode in MODES for c in variant[mode]))
+        self.db.execute("INSERT OR REPLACE INTO palettes VALUES (?, ?, ?)", (primary & 0xFFFFFF, blob, time.time()))
+        self.db.execute(
+            "DELETE FROM palettes WHERE primary_rgb IN "
+            "(SELECT primary_rgb FROM palettes ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (PALETTE_MAX_ENTRIES,),
+        )
+
+    def touch_palette(self, primary: int) -> None:
+        """Mark a record as used for LRU eviction; cheap no-op if it was touched within `ACCESS_RESOLUTION`."""
+        now = time.time()
+        self.db.execute(
+            "UPDATE palettes SET accessed = ? WHERE primary_rgb = ? AND accessed < ?",
+            (now, primary & 0xFFFFFF, now - ACCESS_RESOLUTION),
+        )
+
+    # Maintenance
+
+    def image_entries(self) -> list[tuple[str, float, int | None, str | None]]:
+        """`(hash, accessed, thumb_bytes, source)` for every image; thumb_bytes is None if never recorded."""
+        return self.db.execute("SELECT hash, accessed, thumb_bytes, source FROM images").fetchall()
+
+    def palette_entries(self) -> list[tuple[int, float, int]]:
+        """`(primary_rgb, accessed, bytes)` for every scheme record."""
+        return self.db.execute("SELECT primary_rgb, accessed, length(colours) FROM palettes").fetchall()
+
+    def delete_images(self, digests: list[str]) -> None:
+        self.db.execute("BEGIN")
+        self.db.executemany("DELETE FROM images WHERE hash = ?", ((d,) for d in digests))
+        self.db.execute("COMMIT")
+
+    def delete_palettes(self, primaries: list[int]) -> None:
+        self.db.execute("BEGIN")
+        self.db.executemany("DELETE FROM palettes WHERE primary_rgb = ?", ((p,) for p in primaries))
+        self.db.execute("COMMIT")
+
+    def size(self) -> int:
+        """Bytes on disk, including the write-ahead log."""
+        wal = Path(f"{self.path}-wal")
+        return self.path.stat().st_size + (wal.stat().st_size if wal.exists() else 0)
+
+    def vacuum(self) -> None:
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.db.execute("VACUUM")
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def stats(self) -> dict[str, int]:
+        def count(sql: str) -> int:
+            return self.db.execute(sql).fetchone()[0]
+
+        page_size = count("PRAGMA page_size")
+        return {
+            "bytes": count("PRAGMA page_count") * page_size,
+            "free_bytes": count("PRAGMA freelist_count") * page_size,
+            "images": count("SELECT COUNT(*) FROM images"),
+            "scores": count("SELECT COUNT(score) FROM images"),
+            "smart": count("SELECT COUNT(mode) FROM images"),
+            "palettes": count("SELECT COUNT(*) FROM palettes"),
+        }
+
+    def migrate(self) -> None:
+        """One-time import of the old JSON file cache (score.json, smart.json, per-primary records).
+
+        Imported files are deleted afterwards, as are the obsolete per-variant scheme files;
+        thumbnails and the compiled Discord css are left in place.
+        """
+        start = time.perf_counter()
+        imported = 0
+        self.db.execute("BEGIN IMMEDIATE")
+        if self.get_meta("migrated") is not None:
+            # Another process migrated while this one waited for the lock
+            self.db.execute("COMMIT")
+            return
+        try:
+            for base in (scheme_cache_dir, wallpapers_cache_dir):
+                if not base.is_dir():
+                    continue
+                for entry in os.scandir(base):
+                    if not entry.is_dir() or len(entry.name) != 64:
+                        continue
+                    cache = Path(entry.path)
+                    try:
+                        self.set_score(entry.name, int((cache / "score.json").read_text()))
+                        imported += 1
+                    except (IOError, ValueError):
+                        pass
+                    try:
+                        self.set_smart(entry.name, json.loads((cache / "smart.json").read_text(encoding="utf-8")))
+                        imported += 1
+                    except (IOError, ValueError, KeyError):
+                        pass
+
+            if palette_cache_dir.is_dir():
+                for entry in os.scandir(palette_cache_dir):
+                    try:
+                        with open(entry.path) as f:
+                            self.set_palette(int(Path(entry.name).stem, 16), json.load(f))
+                        imported += 1
+                    except (IOError, ValueError, KeyError):
+                        pass
+
+            self.set_meta("migrated", str(time.time()))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+        # Only drop the old files once their contents are committed
+        shutil.rmtree(palette_cache_dir, ignore_errors=True)
+        if scheme_cache_dir.is_dir():
+            for entry in os.scandir(scheme_cache_dir):
+                if entry.is_dir() and len(entry.name) == 64:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+        if wallpapers_cache_dir.is_dir():
+            for entry in os.scandir(wallpapers_cache_dir):
+                for name in "score.json", "smart.json":
+                    try:
+                        os.unlink(os.path.join(entry.path, name))
+                    except OSError:
+                        pass
+
+        if imported:
+            log_debug(f"Migrated {imported} cache entries to {self.path} in {time.perf_counter() - start:.2f}s")
+
+
+cache_store: CacheStore = None
+
+
+def get_cache_store() -> CacheStore:
+    """Per-process store; worker processes open their own connection on first use."""
+    global cache_store
+
+    if cache_store is None or cache_store.pid != os.getpid():
+        cache_store = CacheStore(cache_db_path)
+
+    return cache_store
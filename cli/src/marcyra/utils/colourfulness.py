@@ -1,62 +1,107 @@
-import math
+from pathlib import Path
+from typing import Sequence
+
 import numpy as np
 
 from PIL import Image
 
+from marcyra.utils.cachestore import get_cache_store
+from marcyra.utils.paths import get_thumb
 
-def mean(values: list[float]) -> float:
-    return sum(values) / len(values) if values else 0
+THUMB_SIZE = 128
+BATCH_SIZE = 256  # thumbnails stacked per pass, ~12 MiB of pixels
+LIGHT_TONE = 60.0  # mean L* above which a wallpaper gets a light scheme
 
+# sRGB channel value -> its share of relative luminance
+_LEVELS = np.arange(256) / 255.0
+_LINEAR = np.where(_LEVELS <= 0.040449936, _LEVELS / 12.92, ((_LEVELS + 0.055) / 1.055) ** 2.4)
+_LUMA = [(weight * _LINEAR).astype(np.float32) for weight in (0.2126, 0.7152, 0.0722)]
 
-def stddev(values: list[float], mean_val: float) -> float:
-    return math.sqrt(sum((x - mean_val) ** 2 for x in values) / len(values)) if values else 0
 
+def stack_thumbs(images: Sequence[Image.Image]) -> tuple[np.ndarray, np.ndarray]:
+    """Stack thumbnails into an (N, 128, 128, 3) uint8 array plus the number of real pixels in each.
 
-def calc_colourfulness(image: Image) -> float:
-    width, height = image.size
-    pixels = list(image.getdata())  # List of (R, G, B) tuples
+    Thumbnails keep their aspect ratio, so each one sits in the top-left corner of a black
+    square. Black adds nothing to the sums below, so padding only has to be left out of
+    the pixel counts.
+    """
+    stack = np.zeros((len(images), THUMB_SIZE, THUMB_SIZE, 3), dtype=np.uint8)
+    counts = np.empty(len(images))
+    for i, image in enumerate(images):
+        arr = np.asarray(image.convert("RGB"))[:THUMB_SIZE, :THUMB_SIZE]
+        stack[i, : arr.shape[0], : arr.shape[1]] = arr
+        counts[i] = max(arr.shape[0] * arr.shape[1], 1)
+    return stack, counts
 
-    rg_diffs = []
-    yb_diffs = []
 
-    for r, g, b in pixels:
-        rg = abs(r - g)
-        yb = abs(0.5 * (r + g) - b)
-        rg_diffs.append(rg)
-        yb_diffs.append(yb)
+def _planes(stack: np.ndarray) -> np.ndarray:
+    """(3, N, pixels) view-copy of a stack, so every channel is contiguous per image."""
+    return np.moveaxis(stack, 3, 0).reshape(3, len(stack), -1)
 
-    mean_rg = mean(rg_diffs)
-    mean_yb = mean(yb_diffs)
-    std_rg = stddev(rg_diffs, mean_rg)
-    std_yb = stddev(yb_diffs, mean_yb)
 
-    return math.sqrt(std_rg**2 + std_yb**2) + 0.3 * math.sqrt(mean_rg**2 + mean_yb**2)
+def calc_colourfulness(stack: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Hasler–Süsstrunk colourfulness of every image in a stack (see `stack_thumbs`).
 
+    The opponent channels are kept integral (`yb` doubled) until they are squared.
+    """
+    r, g, b = _planes(stack).astype(np.int16)
+    rg = np.abs(r - g)
+    yb2 = np.abs(r + g - 2 * b)
+    rg_f, yb2_f = rg.astype(np.float64), yb2.astype(np.float64)
 
-def calc_colorfulness_np(image: Image) -> float:
-    # Ensure RGB
-    arr = np.asarray(image.convert("RGB"), dtype=np.float32)
+    mean_rg = rg.sum(axis=1) / counts
+    mean_yb = yb2.sum(axis=1) / counts / 2
+    std_rg = np.sqrt(np.maximum(np.einsum("ij,ij->i", rg_f, rg_f) / counts - mean_rg**2, 0))
+    std_yb = np.sqrt(np.maximum(np.einsum("ij,ij->i", yb2_f, yb2_f) / counts / 4 - mean_yb**2, 0))
 
-    r = arr[..., 0]
-    g = arr[..., 1]
-    b = arr[..., 2]
+    return np.hypot(std_rg, std_yb) + 0.3 * np.hypot(mean_rg, mean_yb)
 
-    rg = np.abs(r - g)
-    yb = np.abs(0.5 * (r + g) - b)
 
-    std_rg = rg.std()
-    std_yb = yb.std()
-    mean_rg = rg.mean()
-    mean_yb = yb.mean()
+def calc_tone(stack: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Mean HCT tone (L*) over the pixels of every image in a stack."""
+    r, g, b = _planes(stack)
+    y = _LUMA[0][r] + _LUMA[1][g] + _LUMA[2][b]
+    tone = np.where(y > 216.0 / 24389.0, np.cbrt(y) * 116.0 - 16.0, (24389.0 / 27.0) * y)
+    return tone.sum(axis=1) / counts
+
+
+def classify(stack: np.ndarray, counts: np.ndarray) -> list[dict[str, str]]:
+    """Variant and mode for every image in a stack, in one vectorised pass."""
+    colourfulness = calc_colourfulness(stack, counts)
+    variants = np.select([colourfulness < 10, colourfulness < 20], ["neutral", "content"], "tonalspot")
+    modes = np.where(calc_tone(stack, counts) > LIGHT_TONE, "light", "dark")
+    return [{"variant": str(variant), "mode": str(mode)} for variant, mode in zip(variants, modes)]
+
+
+def get_variant(image: Image.Image) -> str:
+    return classify(*stack_thumbs([image]))[0]["variant"]
+
+
+def get_smart_options(wall: Path, cache: Path) -> dict[str, str]:
+    """Variant and mode for a wallpaper; `cache` is its `wallpapers_cache_dir/<hash>` dir."""
+    return get_smart_options_many([(wall, cache)])[0]
+
 
-    return float(np.hypot(std_rg, std_yb) + 0.3 * np.hypot(mean_rg, mean_yb))
+def get_smart_options_many(walls: Sequence[tuple[Path, Path]]) -> list[dict[str, str]]:
+    """Variant and mode for many `(wallpaper, cache dir)` pairs, in order.
 
+    Cached options come from the store in one query. The rest are classified from their
+    128x128 thumbnails (made first if missing) `BATCH_SIZE` at a time, and stored in one
+    transaction per batch.
+    """
+    store = get_cache_store()
+    options = store.get_smarts([cache.name for _, cache in walls])
+    missing = [(wall, cache) for wall, cache in walls if cache.name not in options]
 
-def get_variant(image: Image) -> str:
-    colourfulness = calc_colorfulness_np(image)
+    for i in range(0, len(missing), BATCH_SIZE):
+        batch = missing[i : i + BATCH_SIZE]
+        thumbs = []
+        for wall, cache in batch:
+            with Image.open(get_thumb(wall, cache)) as img:
+                img.load()
+                thumbs.append(img)
+        results = classify(*stack_thumbs(thumbs))
+        store.put_images([(cache.name, None, result, None, None) for (_, cache), result in zip(batch, results)])
+        options.update((cache.name, result) for (_, cache), result in zip(batch, results))
 
-    if colourfulness < 10:
-        return "neutral"
-    if colourfulness < 20:
-        return "content"
-    return "tonalspot"
+    return [options[cache.name] for _, cache in walls]
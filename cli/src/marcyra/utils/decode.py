@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from PIL import Image, ImageFile
+
+from marcyra.utils.logging import log_debug
+
+# Uncompressed TIFFs above this many pixels are decoded band by band (see `_reduce_tiff`)
+TIFF_BANDED_PIXELS = 64 * 1024 * 1024
+TIFF_BAND_PIXELS = 8 * 1024 * 1024  # pixels decoded at once on the banded path
+
+# Named tile tuple (Pillow >= 11); older versions take plain tuples
+_Tile = getattr(ImageFile, "_Tile", lambda *tile: tile)
+
+
+def open_reduced(src: Path | str, size: tuple[int, int]) -> Image.Image:
+    """Decode `src` into an RGB image no smaller than `size`, skipping the full-size buffer where possible.
+
+    JPEGs are scaled by 1/2..1/8 in the DCT (`draft`) and large uncompressed TIFFs are
+    box-reduced a band at a time. Other formats decode at full size; callers shrink them
+    with `thumbnail(..., reducing_gap=...)`, which box-reduces before resampling.
+    """
+    with Image.open(src) as img:
+        img.draft("RGB", size)
+        try:
+            reduced = _reduce_tiff(img, src, size)
+        except Exception as e:
+            # Relies on Pillow internals; a full decode is slower but always works
+            log_debug(f"Banded TIFF decode failed for {src}, decoding whole: {e}")
+            reduced = None
+        if reduced is not None:
+            return reduced
+        if img.mode != "RGB":
+            return img.convert("RGB")
+        img.load()
+        return img
+
+
+def _reduce_tiff(img: Image.Image, src: Path | str, size: tuple[int, int]) -> Image.Image | None:
+    """Box-reduce a large uncompressed TIFF decoding at most ~TIFF_BAND_PIXELS at a time.
+
+    Pillow reads uncompressed strips and tiles straight from the file (`raw` tiles), so
+    each band is loaded as its own image from the matching row range of every tile.
+    Returns None for anything else, including compressed TIFFs which libtiff decodes whole.
+    """
+    width, height = img.size
+    if (
+        img.format != "TIFF"
+        or width * height <= TIFF_BANDED_PIXELS
+        or img.getexif().get(0x0112, 1) != 1  # load() would transpose every band
+        or any(codec != "raw" or args[2] != 1 for codec, _, _, args in img.tile)
+    ):
+        return None
+
+    factor = max(1, min(width // size[0], height // size[1]))
+    band_rows = max(factor, TIFF_BAND_PIXELS // width // factor * factor)
+    # Bytes per row of each tile width, as the raw decoder lays them out
+    strides = [
+        args[1] or len(Image.new(img.mode, (x1 - x0, 1)).tobytes("raw", args[0]))
+        for _, (x0, _, x1, _), _, args in img.tile
+    ]
+
+    out = Image.new("RGB", (-(-width // factor), -(-height // factor)))
+    for top in range(0, height, band_rows):
+        bottom = min(top + band_rows, height)
+        tiles = []
+        for (codec, (x0, y0, x1, y1), offset, args), stride in zip(img.tile, strides):
+            first, last = max(y0, top), min(y1, bottom)
+            if first < last:
+                extents = (x0, first - top, x1, last - top)
+                # Pillow >= 11 reads the next tile's `.offset` while loading
+                tiles.append(_Tile(codec, extents, offset + (first - y0) * stride, args))
+
+        with Image.open(src) as band:
+            # TiffImageFile allocates its buffer from _tile_size
+            band._size = band._tile_size = (width, bottom - top)
+            band.tile = tiles
+            band.load()
+            out.paste(band.convert("RGB").reduce(factor), (0, top // factor))
+    return out
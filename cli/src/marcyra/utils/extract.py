@@ -0,0 +1,119 @@
+import hashlib
+import io
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from marcyra.utils.cachestore import get_cache_store
+from marcyra.utils.colourfulness import classify, get_smart_options_many, stack_thumbs
+from marcyra.utils.hashindex import hash_file
+from marcyra.utils.material import score_many
+from marcyra.utils.paths import compute_hash, wallpapers_cache_dir
+
+if TYPE_CHECKING:
+    from materialyoucolor.hct import Hct
+
+
+def ingest(path: Path | str, digest: str) -> "Hct":
+    """Decode an image once and cache its thumbnail, smart options and primary colour.
+
+    JPEGs are decoded straight at 1/2..1/8 scale (see `open_reduced`). The score quantizes a
+    nearest-neighbour sample of that decode; the 128px thumbnail is resized from it and
+    classified as saved. The thumbnail's own primary (what `get_colours_for_image` asks
+    for once it is the current wallpaper) is scored too, and every row goes to the
+    cache store in one transaction, tied to `digest` so garbage collection removes it too.
+    """
+    from PIL import Image
+
+    from marcyra.utils.decode import open_reduced
+    from marcyra.utils.material.score import QUANTIZE_SIZE, Score, quantize_pixels, subsample
+
+    img = open_reduced(path, (QUANTIZE_SIZE, QUANTIZE_SIZE))
+    primary = Score.score(quantize_pixels(subsample(img)))
+
+    img.thumbnail((128, 128), Image.LANCZOS, reducing_gap=2.0)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG")
+    data = buf.getvalue()
+
+    cache = wallpapers_cache_dir / digest
+    cache.mkdir(parents=True, exist_ok=True)
+    (cache / "thumbnail.jpg").write_bytes(data)
+
+    with Image.open(io.BytesIO(data)) as thumb:
+        thumb = thumb.convert("RGB")
+    options = classify(*stack_thumbs([thumb]))[0]
+    thumb_primary = Score.score(quantize_pixels(subsample(thumb)))
+
+    get_cache_store().put_images(
+        [
+            (digest, primary.to_int(), options, len(data), None),
+            (hashlib.sha256(data).hexdigest(), thumb_primary.to_int(), None, None, digest),
+        ]
+    )
+    return primary
+
+
+def cached_score(digest: str) -> int | None:
+    """The cached score of an image, if its smart options and thumbnail are cached as well."""
+    store = get_cache_store()
+    argb = store.get_score(digest)
+    if (
+        argb is None
+        or store.get_smart(digest) is None
+        or not (wallpapers_cache_dir / digest / "thumbnail.jpg").exists()
+    ):
+        return None
+    return argb
+
+
+def ensure_ingested(path: Path) -> str:
+    """Ingest `path` unless its score, smart options and thumbnail are all cached; returns its hash."""
+    digest = compute_hash(path)
+    if cached_score(digest) is None:
+        ingest(path, digest)
+    return digest
+
+
+def _extract_one(job: tuple[str, str | None]) -> tuple[str, list[float]]:
+    """Worker: hash (if unknown) and ingest one image, unless its contents are already cached.
+
+    Files are only sent here when their stat fingerprint is not indexed, which includes
+    touched, renamed and moved files whose hash is cached already.
+    """
+    path, digest = job
+    if digest is None:
+        digest = hash_file(path)
+
+    argb = cached_score(digest)
+    if argb is not None:
+        from materialyoucolor.hct import Hct
+
+        primary = Hct.from_int(argb)
+    else:
+        primary = ingest(path, digest)
+    return digest, [primary.hue, primary.chroma, primary.tone]
+
+
+def extract_features(images: list[Path], jobs: int | None = None) -> np.ndarray:
+    """Populate the per-image cache for every image and return an (N, 3) array of HCT primaries.
+
+    Images with a cached score are resolved in bulk by `score_many`; the rest are
+    thumbnailed, classified and scored in up to `jobs` processes (default: all cores).
+    """
+    if not images:
+        return np.empty((0, 3))
+
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    features = score_many(images, jobs, worker=_extract_one)
+    # Images scored before their smart options were (re)computed are classified in bulk
+    get_smart_options_many([(p, wallpapers_cache_dir / compute_hash(p)) for p in images])
+    elapsed = time.perf_counter() - start
+
+    rate = len(images) / max(elapsed, 1e-6)
+    print(f"Extracted {len(images)} images in {elapsed:.2f}s ({rate:.1f} images/s, {jobs} jobs)")
+    return features
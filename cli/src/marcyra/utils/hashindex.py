@@ -0,0 +1,122 @@
+import atexit
+import hashlib
+import os
+from pathlib import Path
+
+from marcyra.utils.logging import log_debug
+from marcyra.utils.paths import atomic_dump, hash_index_path, load_json_or
+
+
+def hash_file(path: Path | str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(8192):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _fingerprint(path: str) -> list[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+class HashIndex:
+    """Persistent map of file stat fingerprints to SHA-256 content digests.
+
+    Entries are keyed by absolute path and store `[size, mtime_ns, inode, digest]`.
+    A lookup only reads the file when its fingerprint no longer matches, so a
+    warm run resolves every cache key with a single `stat()`. Several processes share
+    the file (e.g. the daemon and `wallpaper --sort`), so saves merge this process's
+    changes into what is on disk instead of overwriting it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, list] = load_json_or(path, {})
+        self._changes: dict[str, list | None] = {}  # since the last save; None marks a removal
+
+    def get(self, file: Path | str) -> str:
+        digest = self.lookup(file)
+        if digest is not None:
+            return digest
+
+        digest = hash_file(file)
+        self.record(file, digest)
+        return digest
+
+    def lookup(self, file: Path | str) -> str | None:
+        """Return the indexed digest if the file is unchanged, without ever reading it."""
+        key = os.path.abspath(file)
+        entry = self._entries.get(key)
+        if entry and entry[:3] == _fingerprint(key):
+            self.hits += 1
+            return entry[3]
+
+        self.misses += 1
+        return None
+
+    def record(self, file: Path | str, digest: str) -> None:
+        """Store a digest computed elsewhere (e.g. by a worker process)."""
+        key = os.path.abspath(file)
+        self._entries[key] = self._changes[key] = [*_fingerprint(key), digest]
+
+    def forget(self, file: Path | str) -> None:
+        key = os.path.abspath(file)
+        if self._entries.pop(key, None) is not None:
+            self._changes[key] = None
+
+    def prune(self, dry_run: bool = False) -> set[str]:
+        """Forget files that no longer exist and return the digests left without any source.
+
+        A digest is returned only if every indexed path that had it is gone. Digests the
+        index never saw are not returned: their sources may exist but not be indexed yet.
+        """
+        self.reload()
+        live, gone = set(), set()
+        for key, entry in list(self._entries.items()):
+            if os.path.exists(key):
+                live.add(entry[3])
+            else:
+                gone.add(entry[3])
+                if not dry_run:
+                    del self._entries[key]
+                    self._changes[key] = None
+        return gone - live
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def reload(self) -> None:
+        """Re-read the file, keeping the changes this process has not saved yet."""
+        self._entries = load_json_or(self.path, {})
+        for key, entry in self._changes.items():
+            if entry is None:
+                self._entries.pop(key, None)
+            else:
+                self._entries[key] = entry
+
+    def save(self) -> None:
+        if self._changes:
+            self.reload()
+            atomic_dump(self.path, self._entries)
+            self._changes.clear()
+
+    def _on_exit(self) -> None:
+        self.save()
+        if self.hits or self.misses:
+            log_debug(f"Hash index: {self.hits} hits, {self.misses} misses ({len(self._entries)} entries)")
+
+
+hash_index: HashIndex = None
+
+
+def get_hash_index() -> HashIndex:
+    global hash_index
+
+    if hash_index is None:
+        hash_index = HashIndex(hash_index_path)
+        atexit.register(hash_index._on_exit)
+
+    return hash_index
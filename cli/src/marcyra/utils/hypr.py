@@ -1,35 +1,121 @@
 import json as j
 import os
 import socket
+import time
+from typing import TYPE_CHECKING, AsyncIterator
+
+if TYPE_CHECKING:
+    import asyncio
 
 socket_base = f"{os.getenv('XDG_RUNTIME_DIR')}/hypr/{os.getenv('HYPRLAND_INSTANCE_SIGNATURE')}"
 socket_path = f"{socket_base}/.socket.sock"
 socket2_path = f"{socket_base}/.socket2.sock"
 
+MONITORS_TTL = 2.0  # seconds a `monitors` reply is reused
+BATCH_SEPARATOR = "\n\n\n"  # between the replies to a [[BATCH]] request
+RECV_BUFFER = 64 * 1024  # initial reply buffer, grown on demand
 
-def message(msg: str, json: bool = True) -> str | dict[str, any]:
-    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
-        sock.connect(socket_path)
 
+class HyprClient:
+    """Client for Hyprland's request socket.
+
+    Hyprland answers one request per connection and then closes it, so requests are
+    pipelined instead: `batch` sends several in one `[[BATCH]]` round trip. Replies are
+    read with `recv_into` into one buffer kept for the life of the client, and the
+    `monitors` reply is cached for `monitors_ttl` seconds (until `invalidate`).
+    """
+
+    def __init__(self, path: str = socket_path, monitors_ttl: float = MONITORS_TTL) -> None:
+        self.path = path
+        self.monitors_ttl = monitors_ttl
+        self.buffer = bytearray(RECV_BUFFER)
+        self._monitors: list[dict] | None = None
+        self._monitors_at = 0.0
+
+    def request(self, msg: str) -> str:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.path)
+            sock.sendall(msg.encode())
+
+            size = 0
+            while True:
+                if size == len(self.buffer):
+                    self.buffer.extend(bytes(len(self.buffer)))
+                with memoryview(self.buffer) as view:
+                    received = sock.recv_into(view[size:])
+                if not received:
+                    break
+                size += received
+
+        return self.buffer[:size].decode()
+
+    def message(self, msg: str, json: bool = True) -> str | dict[str, any]:
+        if json:
+            return j.loads(self.request(f"j/{msg}"))
+        return self.request(msg)
+
+    def batch(self, *msgs: str, json: bool = False) -> list[str] | list[dict[str, any]]:
+        """Send every message in one round trip and return their replies in order."""
         if json:
-            msg = f"j/{msg}"
-        sock.send(msg.encode())
+            msgs = tuple(f"j/{m.strip()}" for m in msgs)
+        replies = self.request(f"[[BATCH]]{';'.join(msgs)}").split(BATCH_SEPARATOR)[: len(msgs)]
+        return [j.loads(r) for r in replies] if json else replies
+
+    def dispatch(self, dispatcher: str, *args: list[any]) -> bool:
+        return self.message(f"dispatch {dispatcher} {' '.join(map(str, args))}".rstrip(), json=False) == "ok"
+
+    def monitors(self) -> list[dict]:
+        now = time.monotonic()
+        if self._monitors is None or now - self._monitors_at > self.monitors_ttl:
+            self._monitors = self.message("monitors")
+            self._monitors_at = now
+        return self._monitors
+
+    def invalidate(self) -> None:
+        """Drop cached replies, e.g. after a monitor was added or removed."""
+        self._monitors = None
+
 
-        resp = sock.recv(8192).decode()
-        while True:
-            new_resp = sock.recv(8192)
-            if not new_resp:
-                break
-            resp += new_resp.decode()
+client: HyprClient = None
 
-        return j.loads(resp) if json else resp
+
+def get_client() -> HyprClient:
+    global client
+
+    if client is None:
+        client = HyprClient()
+
+    return client
+
+
+def message(msg: str, json: bool = True) -> str | dict[str, any]:
+    return get_client().message(msg, json)
 
 
 def dispatch(dispatcher: str, *args: list[any]) -> bool:
-    return message(f"dispatch {dispatcher} {' '.join(map(str, args))}".rstrip(), json=False) == "ok"
+    return get_client().dispatch(dispatcher, *args)
+
+
+def batch(*msgs: list[str], json: bool = False) -> list[str] | list[dict[str, any]]:
+    return get_client().batch(*msgs, json=json)
+
+
+def get_monitors() -> list[dict]:
+    """`monitors` as JSON, cached for `MONITORS_TTL` seconds."""
+    return get_client().monitors()
+
+
+async def connect_events(path: str = socket2_path) -> tuple["asyncio.StreamReader", "asyncio.StreamWriter"]:
+    import asyncio
+
+    return await asyncio.open_unix_connection(path)
+
 
+async def read_events(reader: "asyncio.StreamReader") -> AsyncIterator[tuple[str, str]]:
+    """Yield `(event, data)` for each `EVENT>>DATA` line on the event socket as it arrives.
 
-def batch(*msgs: list[str], json: bool = False) -> str | dict[str, any]:
-    if json:
-        msgs = (f"j/{m.strip()}" for m in msgs)
-    return message(f"[[BATCH]]{';'.join(msgs)}", json=False)
+    Lines split across reads are reassembled by the stream; ends when Hyprland closes it.
+    """
+    while line := await reader.readline():
+        event, _, data = line.decode(errors="replace").rstrip("\n").partition(">>")
+        yield event, data
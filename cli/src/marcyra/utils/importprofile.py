@@ -0,0 +1,88 @@
+import atexit
+import sys
+import time
+
+# Wall-clock budget for importing everything `marcyra scheme list --names` needs.
+# Subcommand modules must keep heavy dependencies (PIL, numpy, sklearn,
+# materialyoucolor) behind function-level imports to stay under it.
+STARTUP_BUDGET_MS = 150.0
+
+
+class ImportProfiler:
+    """Record self and cumulative import time per module from a `sys.meta_path` finder.
+
+    The finder asks the finders behind it for each spec and wraps the loader's
+    `exec_module`, so every module that actually executes is timed however it was
+    imported (`from package import submodule`, relative imports, `importlib`). Nested
+    imports are subtracted from the parent so that `self` is the module's own cost.
+    Built-in and frozen modules are loaded by classes shared between modules and are
+    not timed.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.timings: dict[str, tuple[float, float]] = {}
+        self.imports = 0.0
+        self._stack: list[float] = []
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                self._wrap(spec.loader)
+                return spec
+        return None
+
+    def _wrap(self, loader) -> None:
+        # One wrapper per loader instance; some loaders (zipimport) serve many modules
+        if loader is None or isinstance(loader, type) or getattr(loader, "_profiled", False):
+            return
+
+        original = loader.exec_module
+
+        def exec_module(module) -> None:
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                original(module)
+            finally:
+                cumulative = time.perf_counter() - start
+                children = self._stack.pop()
+                if self._stack:
+                    self._stack[-1] += cumulative
+                else:
+                    self.imports += cumulative
+                self.timings.setdefault(module.__name__, (cumulative - children, cumulative))
+
+        try:
+            loader.exec_module = exec_module
+            loader._profiled = True
+        except AttributeError:
+            pass  # Loaders with __slots__ stay untimed
+
+    def enable(self) -> None:
+        sys.meta_path.insert(0, self)
+        atexit.register(self.report)
+
+    def report(self, limit: int = 25) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        total = (time.perf_counter() - self.start) * 1000
+        imports = self.imports * 1000
+
+        print(f"{'self ms':>9} {'total ms':>9}  module", file=sys.stderr)
+        for name, (own, cumulative) in sorted(self.timings.items(), key=lambda kv: kv[1][0], reverse=True)[:limit]:
+            print(f"{own * 1000:9.2f} {cumulative * 1000:9.2f}  {name}", file=sys.stderr)
+        status = "over" if imports > STARTUP_BUDGET_MS else "within"
+        print(
+            f"Imports: {imports:.1f} ms ({status} {STARTUP_BUDGET_MS:.0f} ms budget), run: {total:.1f} ms",
+            file=sys.stderr,
+        )
+
+
+def enable() -> ImportProfiler:
+    profiler = ImportProfiler()
+    profiler.enable()
+    return profiler
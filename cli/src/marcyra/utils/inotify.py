@@ -0,0 +1,93 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+from pathlib import Path
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+# Files are picked up once fully written, directories as soon as they appear
+TREE_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal ctypes binding for Linux inotify, for use with a select/asyncio reader.
+
+    `read()` returns `(path, mask)` tuples where `path` is the full path of the
+    affected entry, or None when the kernel queue overflowed and events were lost.
+    Watches added through `add_tree` follow new subdirectories.
+    """
+
+    def __init__(self) -> None:
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._watches: dict[int, Path] = {}
+        self._recursive: set[int] = set()
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def add_watch(self, path: Path, mask: int, recursive: bool = False) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+        self._watches[wd] = Path(path)
+        if recursive:
+            self._recursive.add(wd)
+        return wd
+
+    def add_tree(self, root: Path, mask: int = TREE_MASK) -> None:
+        for dirpath, _, _ in os.walk(root, followlinks=True):
+            try:
+                self.add_watch(Path(dirpath), mask, recursive=True)
+            except OSError:
+                pass
+
+    def read(self) -> list[tuple[Path | None, int]]:
+        try:
+            buf = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask))
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                self._recursive.discard(wd)
+                continue
+
+            base = self._watches.get(wd)
+            if base is None:
+                continue
+            path = base / os.fsdecode(name) if name else base
+
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and wd in self._recursive:
+                self.add_tree(path)
+            events.append((path, mask))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
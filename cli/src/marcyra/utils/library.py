@@ -0,0 +1,119 @@
+import atexit
+import os
+import time
+from pathlib import Path
+
+from marcyra.utils.logging import log_debug
+from marcyra.utils.paths import atomic_dump, library_index_path, load_json_or
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff"}
+VERSION = 1
+RACY_NS = 2_000_000_000  # directories modified this recently are listed again next time
+
+
+class LibraryIndex:
+    """Persistent listing of the image files under wallpaper directories.
+
+    Entries are keyed by real directory path and store the directory's `mtime_ns`, its
+    image file names, its symlinked images (name -> target) and its subdirectories. A
+    directory's mtime changes whenever an entry is added, removed or renamed in it, so
+    a scan only lists directories whose mtime moved and otherwise costs one `stat()` per
+    directory. Directories modified within `RACY_NS` of being listed are not trusted,
+    since a change in the same clock tick would not move the mtime.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.listed = 0
+        data = load_json_or(path, {})
+        self._dirs: dict[str, dict] = data.get("dirs", {}) if data.get("version") == VERSION else {}
+        self._dirty = False
+
+    def scan(self, root: Path | str) -> list[Path]:
+        """Every image under `root` (following directory symlinks) as a unique real path."""
+        root = os.path.realpath(root)
+        files: dict[str, None] = {}
+        visited: set[str] = set()
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            if directory in visited:
+                continue
+            visited.add(directory)
+
+            entry = self._entry(directory)
+            if entry is None:
+                continue
+            base = os.path.join(directory, "")
+            files.update(dict.fromkeys([base + name for name in entry["files"]]))
+            files.update(dict.fromkeys(entry["links"].values()))
+            stack.extend(entry["dirs"])
+
+        # Forget directories under this root that are gone
+        prefix = os.path.join(root, "")
+        for key in [k for k in self._dirs if k.startswith(prefix) and k not in visited]:
+            del self._dirs[key]
+            self._dirty = True
+
+        return [Path(f) for f in files]
+
+    def _entry(self, directory: str) -> dict | None:
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._dirs.pop(directory, None)
+            return None
+
+        entry = self._dirs.get(directory)
+        if entry is not None and entry["mtime"] == mtime:
+            return entry
+        try:
+            return self._list(directory, mtime)
+        except OSError:
+            return None
+
+    def _list(self, directory: str, mtime: int) -> dict:
+        files, links, dirs = [], {}, []
+        with os.scandir(directory) as it:
+            for e in it:
+                try:
+                    if e.is_dir():
+                        dirs.append(os.path.realpath(e.path) if e.is_symlink() else e.path)
+                    elif os.path.splitext(e.name)[1].lower() in IMAGE_SUFFIXES and e.is_file():
+                        if e.is_symlink():
+                            links[e.name] = os.path.realpath(e.path)
+                        else:
+                            files.append(e.name)
+                except OSError:
+                    pass
+
+        if time.time_ns() - mtime < RACY_NS:
+            mtime = -1
+        entry = {"mtime": mtime, "files": files, "links": links, "dirs": dirs}
+        self._dirs[directory] = entry
+        self._dirty = True
+        self.listed += 1
+        return entry
+
+    def save(self) -> None:
+        if self._dirty:
+            atomic_dump(self.path, {"version": VERSION, "dirs": self._dirs})
+            self._dirty = False
+
+    def _on_exit(self) -> None:
+        self.save()
+        if self.listed:
+            log_debug(f"Library index: listed {self.listed} of {len(self._dirs)} directories")
+
+
+library_index: LibraryIndex = None
+
+
+def get_library_index() -> LibraryIndex:
+    global library_index
+
+    if library_index is None:
+        library_index = LibraryIndex(library_index_path)
+        atexit.register(library_index._on_exit)
+
+    return library_index
@@ -1,11 +1,26 @@
+import sys
 from time import strftime
 
+verbose = False
+
+
+def set_verbose(enabled: bool) -> None:
+    global verbose
+    verbose = enabled
+
 
 def log_message(message: str) -> None:
     timestamp = strftime("%Y-%m-%d %H:%M:%S")
     print(f"[{timestamp}] {message}")
 
 
+def log_debug(message: str) -> None:
+    """Log to stderr, only when `--verbose` is given, so stdout stays machine-readable."""
+    if verbose:
+        timestamp = strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] {message}", file=sys.stderr)
+
+
 def log_exception(func):
     """Log exceptions to stdout instead of raising
 
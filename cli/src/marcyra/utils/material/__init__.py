@@ -1,7 +1,14 @@
-import json
+import os
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Sequence
 
-from marcyra.utils.paths import compute_hash, scheme_cache_dir, wallpaper_thumbnail_path
+from marcyra.utils.paths import compute_hash, wallpaper_thumbnail_path
+
+if TYPE_CHECKING:
+    import numpy as np
+
+ScoreWorker = Callable[[tuple[str, str | None]], tuple[str, list[float]]]
 
 
 def get_colours_for_image(image: Path | str = wallpaper_thumbnail_path, scheme=None) -> dict[str, str]:
@@ -10,42 +17,164 @@ def get_colours_for_image(image: Path | str = wallpaper_thumbnail_path, scheme=N
 
         scheme = get_scheme()
 
-    cache_base = scheme_cache_dir / compute_hash(image)
-    cache = (cache_base / scheme.variant / scheme.mode).with_suffix(".json")
+    primary = get_score_for_image(image, compute_hash(image))
+    return get_colours_for_primary(primary.to_int(), scheme.variant, scheme.mode)
+
+
+def get_colours_for_primary(primary: int, variant: str, mode: str) -> dict[str, str]:
+    """Look up the scheme for a primary ARGB colour in its all-variants record (see `get_schemes_for_primary`)."""
+    record = get_schemes_for_primary(primary)
+    schemes = record["schemes"]
+    values = schemes.get(variant, schemes["vibrant"])["light" if mode == "light" else "dark"]
+    return dict(zip(record["names"], values))
+
+
+@lru_cache(maxsize=16)
+def get_schemes_for_primary(primary: int) -> dict:
+    """Return the record holding every variant x mode scheme for a primary colour, generating it once.
+
+    Records are shared by every image with that primary and kept in the cache store as
+    `{"names": [...], "schemes": {variant: {mode: [hex, ...]}}}`.
+    """
+    from marcyra.utils.cachestore import get_cache_store
+
+    store = get_cache_store()
+    record = store.get_palette(primary)
+    if record is not None:
+        store.touch_palette(primary)
+        return record
+
+    from materialyoucolor.hct import Hct
+
+    from marcyra.utils.material.generator import gen_schemes
+    from marcyra.utils.scheme import scheme_variants
 
-    try:
-        with cache.open("r") as f:
-            return json.load(f)
-    except (IOError, json.JSONDecodeError):
-        pass
+    schemes = gen_schemes(Hct.from_int(0xFF000000 | primary), scheme_variants)
+    names = list(schemes[scheme_variants[0]]["dark"])
+    record = {
+        "names": names,
+        "schemes": {
+            variant: {mode: [colours[name] for name in names] for mode, colours in modes.items()}
+            for variant, modes in schemes.items()
+        },
+    }
 
-    from marcyra.utils.material.generator import gen_scheme
+    store.set_palette(primary, record)
+    return record
 
-    primary = get_score_for_image(image, cache_base)
-    scheme = gen_scheme(scheme, primary)
 
-    cache.parent.mkdir(parents=True, exist_ok=True)
-    with cache.open("w") as f:
-        json.dump(scheme, f)
+def warm_palettes(primaries: Iterable[int]) -> int:
+    """Precompute the all-variants record for every primary; returns the number generated."""
+    from marcyra.utils.cachestore import get_cache_store
 
-    return scheme
+    store = get_cache_store()
+    generated = 0
+    for primary in primaries:
+        if store.get_palette(primary) is None:
+            generated += 1
+        get_schemes_for_primary(primary)
+    return generated
 
 
-def get_score_for_image(image: Path | str, cache_base: Path):
+def get_score_for_image(image: Path | str, digest: str):
+    """Primary colour of an image, cached in the cache store under its content hash."""
     from materialyoucolor.hct import Hct
 
-    cache = cache_base / "score.json"
+    from marcyra.utils.cachestore import get_cache_store
 
-    try:
-        return Hct.from_int(cache.read_text())
-    except (IOError, TypeError):
-        pass
+    store = get_cache_store()
+    argb = store.get_score(digest)
+    if argb is not None:
+        return Hct.from_int(argb)
 
     from marcyra.utils.material.score import score
 
     s = score(str(image))
-
-    cache.parent.mkdir(parents=True, exist_ok=True)
-    cache.write_text(str(s.to_int()))
+    store.set_score(digest, s.to_int())
 
     return s
+
+
+def _score_one(job: tuple[str, str | None]) -> tuple[str, list[float]]:
+    """Worker: hash (if unknown) and score one image into the cache store."""
+    from marcyra.utils.hashindex import hash_file
+
+    path, digest = job
+    if digest is None:
+        digest = hash_file(path)
+
+    primary = get_score_for_image(path, digest)
+    return digest, [primary.hue, primary.chroma, primary.tone]
+
+
+def iter_scores(
+    paths: Sequence[Path | str], jobs: int | None = None, worker: ScoreWorker = _score_one
+) -> Iterator[tuple[int, list[float]]]:
+    """Yield `(index, [hue, chroma, tone])` for every path as soon as its primary is known.
+
+    Scores already in the cache store are fetched in one query and yielded first without
+    touching the pool; misses are quantized by `worker` in up to `jobs` processes and
+    yielded in completion order. `worker` takes `(path, digest | None)` and returns
+    `(digest, row)`, so callers can fold more per-image cache work into the same pass.
+    """
+    from materialyoucolor.hct import Hct
+
+    from marcyra.utils.cachestore import get_cache_store
+    from marcyra.utils.hashindex import get_hash_index
+
+    index = get_hash_index()
+    digests = [index.lookup(p) for p in paths]
+    cached = get_cache_store().get_scores([d for d in digests if d is not None])
+
+    misses: list[tuple[int, str, str | None]] = []
+    for i, (p, digest) in enumerate(zip(paths, digests)):
+        if digest in cached:
+            primary = Hct.from_int(cached[digest])
+            yield i, [primary.hue, primary.chroma, primary.tone]
+        else:
+            misses.append((i, str(p), digest))
+
+    if not misses:
+        return
+
+    jobs = min(jobs or os.cpu_count() or 1, len(misses))
+    if jobs == 1:
+        for i, path, known in misses:
+            digest, row = worker((path, known))
+            if known is None:
+                index.record(path, digest)
+            yield i, row
+        return
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    ctx = multiprocessing.get_context("forkserver")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as pool:
+        futures = {pool.submit(worker, (path, known)): (i, path, known) for i, path, known in misses}
+        for future in as_completed(futures):
+            i, path, known = futures[future]
+            digest, row = future.result()
+            if known is None:
+                index.record(path, digest)
+            yield i, row
+
+
+def score_many(
+    paths: Sequence[Path | str],
+    jobs: int | None = None,
+    on_result: Callable[[int, list[float]], None] | None = None,
+    worker: ScoreWorker = _score_one,
+) -> "np.ndarray":
+    """Return an (N, 3) array of (hue, chroma, tone) primaries, one row per path in order.
+
+    `on_result(index, row)` is called for each image as it finishes; see `iter_scores`.
+    """
+    import numpy as np
+
+    scores = np.empty((len(paths), 3))
+    for i, row in iter_scores(paths, jobs, worker):
+        scores[i] = row
+        if on_result is not None:
+            on_result(i, row)
+    return scores
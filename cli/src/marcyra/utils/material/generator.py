@@ -1,4 +1,6 @@
-from typing import Mapping, Type
+import copy
+from functools import lru_cache
+from typing import Iterable, Mapping, Type
 from materialyoucolor.hct import Hct
 from materialyoucolor.blend import Blend
 
@@ -167,20 +169,52 @@ def mix(a: Hct, b: Hct, w: float) -> Hct:
     return Hct.from_int(Blend.cam16_ucs(a.to_int(), b.to_int(), w))
 
 
+@lru_cache(maxsize=1024)
+def _harmonize_argb(from_argb: int, to_argb: int) -> int:
+    return Blend.harmonize(from_argb, to_argb)
+
+
 def harmonize(from_hct: Hct, to_hct: Hct, tone_boost: float) -> Hct:
     # Use official harmonize to move hue toward key; apply clamped tone boost.
-    hct = Hct.from_int(Blend.harmonize(from_hct.to_int(), to_hct.to_int()))
+    hct = Hct.from_int(_harmonize_argb(from_hct.to_int(), to_hct.to_int()))
     boost = 1.0 + tone_boost
     return _with_hct(hct.hue, hct.chroma, hct.tone * boost)
 
 
 def gen_scheme(scheme, primary: Hct) -> dict[str, str]:
     light = scheme.mode == "light"
-
+    return _gen_colours(get_scheme(scheme.variant)(primary, not light, 0), scheme.variant, light)
+
+
+def gen_schemes(
+    primary: Hct, variants: Iterable[str], modes: Iterable[str] = ("dark", "light")
+) -> dict[str, dict[str, dict[str, str]]]:
+    """Generate `{variant: {mode: colours}}` for one primary colour.
+
+    Each variant's tonal palettes (and their tone caches) are built once and shared by
+    every mode, and the error palette is shared by all variants.
+    """
+    modes = list(modes)
+    error_palette = None
+    schemes = {}
+    for variant in variants:
+        base = get_scheme(variant)(primary, modes[0] != "light", 0)
+        if error_palette is None:
+            error_palette = base.error_palette
+        base.error_palette = error_palette
+
+        schemes[variant] = {}
+        for mode in modes:
+            dynamic = copy.copy(base)
+            dynamic.is_dark = mode != "light"
+            schemes[variant][mode] = _gen_colours(dynamic, variant, mode == "light")
+    return schemes
+
+
+def _gen_colours(primary_scheme: DynamicScheme, variant: str, light: bool) -> dict[str, str]:
     colours = {}
 
     # Material colours
-    primary_scheme = get_scheme(scheme.variant)(primary, not light, 0)
     for colour in vars(MaterialDynamicColors).keys():
         colour_name = getattr(MaterialDynamicColors, colour)
         if hasattr(colour_name, "get_hct"):
@@ -188,7 +222,7 @@ def gen_scheme(scheme, primary: Hct) -> dict[str, str]:
 
     # Harmonize terminal colours
     for i, hct in enumerate(light_gruvbox if light else dark_gruvbox):
-        if scheme.variant == "monochrome":
+        if variant == "monochrome":
             colours[f"term{i}"] = grayscale(hct, light)
         else:
             colours[f"term{i}"] = harmonize(
@@ -197,7 +231,7 @@ def gen_scheme(scheme, primary: Hct) -> dict[str, str]:
 
     # Harmonize named colours
     for i, hct in enumerate(light_catppuccin if light else dark_catppuccin):
-        if scheme.variant == "monochrome":
+        if variant == "monochrome":
             colours[colour_names[i]] = grayscale(hct, light)
         else:
             colours[colour_names[i]] = harmonize(hct, colours["primary_paletteKeyColor"], (-0.2 if light else 0.05))
@@ -206,11 +240,11 @@ def gen_scheme(scheme, primary: Hct) -> dict[str, str]:
     for colour in kcolours:
         colours[colour["name"]] = harmonize(colour["hct"], colours["primary"], 0.1)
         colours[f"{colour['name']}Selection"] = harmonize(colour["hct"], colours["onPrimaryFixedVariant"], 0.1)
-        if scheme.variant == "monochrome":
+        if variant == "monochrome":
             colours[colour["name"]] = grayscale(colours[colour["name"]], light)
             colours[f"{colour['name']}Selection"] = grayscale(colours[f"{colour['name']}Selection"], light)
 
-    if scheme.variant == "neutral":
+    if variant == "neutral":
         for name, hct in colours.items():
             colours[name].chroma -= 15
 
@@ -235,14 +269,14 @@ def gen_scheme(scheme, primary: Hct) -> dict[str, str]:
 
     # Extended material
     if light:
-        colours["success"] = "4F6354"
-        colours["onSuccess"] = "FFFFFF"
-        colours["successContainer"] = "D1E8D5"
-        colours["onSuccessContainer"] = "0C1F13"
+        colours["success"] = "4f6354"
+        colours["onSuccess"] = "ffffff"
+        colours["successContainer"] = "d1e8d5"
+        colours["onSuccessContainer"] = "0c1f13"
     else:
-        colours["success"] = "B5CCBA"
+        colours["success"] = "b5ccba"
         colours["onSuccess"] = "213528"
-        colours["successContainer"] = "374B3E"
-        colours["onSuccessContainer"] = "D1E9D6"
+        colours["successContainer"] = "374b3e"
+        colours["onSuccessContainer"] = "d1e9d6"
 
     return colours
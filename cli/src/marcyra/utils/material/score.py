@@ -1,7 +1,60 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
 from materialyoucolor.dislike.dislike_analyzer import DislikeAnalyzer
 from materialyoucolor.hct import Hct
-from materialyoucolor.quantize import ImageQuantizeCelebi
-from materialyoucolor.utils.math_utils import sanitize_degrees_int
+from materialyoucolor.hct.viewing_conditions import ViewingConditions
+from materialyoucolor.quantize import ImageQuantizeCelebi, QuantizeCelebi
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+_VC = ViewingConditions.make()
+
+# Longest side of the pixel buffer `score` quantizes. Nearest-neighbour subsampling keeps
+# the source's exact colours, so the primary rarely moves; None quantizes every pixel.
+QUANTIZE_SIZE = 256
+
+
+def hct_arrays(argb: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorised `Hct.from_int` over an array of ARGB ints: returns (hue, chroma, tone) arrays."""
+    argb = np.asarray(argb, dtype=np.int64)
+    rgb = np.stack([(argb >> 16) & 0xFF, (argb >> 8) & 0xFF, argb & 0xFF]).astype(np.float64) / 255.0
+    lin = np.where(rgb <= 0.040449936, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4) * 100.0
+    r_l, g_l, b_l = lin
+
+    x = 0.41233895 * r_l + 0.35762064 * g_l + 0.18051042 * b_l
+    y = 0.2126 * r_l + 0.7152 * g_l + 0.0722 * b_l
+    z = 0.01932141 * r_l + 0.11916382 * g_l + 0.95034478 * b_l
+
+    # CAM16 hue and chroma under the default viewing conditions
+    r_d = _VC.rgb_d[0] * (0.401288 * x + 0.650173 * y - 0.051461 * z)
+    g_d = _VC.rgb_d[1] * (-0.250268 * x + 1.204414 * y + 0.045854 * z)
+    b_d = _VC.rgb_d[2] * (-0.002079 * x + 0.048952 * y + 0.953127 * z)
+
+    def adapt(d: np.ndarray) -> np.ndarray:
+        af = ((_VC.fl * np.abs(d)) / 100.0) ** 0.42
+        return (np.sign(d) * 400.0 * af) / (af + 27.13)
+
+    r_a, g_a, b_a = adapt(r_d), adapt(g_d), adapt(b_d)
+    a = (11.0 * r_a + -12.0 * g_a + b_a) / 11.0
+    b = (r_a + g_a - 2.0 * b_a) / 9.0
+    u = (20.0 * r_a + 20.0 * g_a + 21.0 * b_a) / 20.0
+    p2 = (40.0 * r_a + 20.0 * g_a + b_a) / 20.0
+
+    hue = np.degrees(np.arctan2(b, a)) % 360.0
+    j = 100.0 * ((p2 * _VC.nbb) / _VC.aw) ** (_VC.c * _VC.z)
+    hue_prime = np.where(hue < 20.14, hue + 360.0, hue)
+    e_hue = 0.25 * (np.cos(np.radians(hue_prime) + 2.0) + 3.8)
+    p1 = (50000.0 / 13.0) * e_hue * _VC.nc * _VC.ncb
+    t = (p1 * np.hypot(a, b)) / (u + 0.305)
+    alpha = t**0.9 * (1.64 - 0.29**_VC.n) ** 0.73
+    chroma = alpha * np.sqrt(j / 100.0)
+
+    # L* from relative luminance
+    yn = y / 100.0
+    tone = np.where(yn > 216.0 / 24389.0, np.cbrt(yn), ((24389.0 / 27.0) * yn + 16.0) / 116.0) * 116.0 - 16.0
+    return hue, chroma, tone
 
 
 class Score:
@@ -11,60 +64,75 @@ class Score:
     WEIGHT_CHROMA_BELOW = 0.1
     CUTOFF_CHROMA = 5.0
     CUTOFF_EXCITED_PROPORTION = 0.01
+    FALLBACK_COLOUR = 0xFF4285F4  # Google Blue, used when no colour is usable at all
 
     def __init__(self):
         pass
 
     @staticmethod
     def score(colors_to_population: dict, filter_enabled: bool = False) -> Hct:
-        colors_hct = []
-        hue_population = [0] * 360
-        population_sum = 0
-
-        for rgb, population in colors_to_population.items():
-            hct = Hct.from_int(rgb)
-            colors_hct.append(hct)
-            hue = int(hct.hue)
-            hue_population[hue] += population
-            population_sum += population
+        if not colors_to_population:
+            return Hct.from_int(Score.FALLBACK_COLOUR)
 
-        hue_excited_proportions = [0.0] * 360
+        argb = np.fromiter(colors_to_population.keys(), dtype=np.int64, count=len(colors_to_population))
+        population = np.fromiter(colors_to_population.values(), dtype=np.float64, count=len(colors_to_population))
+        hue, chroma, tone = hct_arrays(argb)
 
-        for hue in range(360):
-            proportion = hue_population[hue] / population_sum
-            for i in range(hue - 14, hue + 16):
-                neighbor_hue = int(sanitize_degrees_int(i))
-                hue_excited_proportions[neighbor_hue] += proportion
+        # Hue histogram, spread over the 30 neighbouring hues [h - 14, h + 15] as a circular convolution
+        proportions = np.bincount(hue.astype(np.int64), weights=population, minlength=360) / population.sum()
+        padded = np.concatenate([proportions[-15:], proportions, proportions[:14]])
+        excited = np.convolve(padded, np.ones(30), mode="valid")
 
         # Score colours
-        scored_hct = []
-        for hct in colors_hct:
-            hue = int(sanitize_degrees_int(round(hct.hue)))
-            proportion = hue_excited_proportions[hue]
-
-            if filter_enabled and (hct.chroma < Score.CUTOFF_CHROMA or proportion <= Score.CUTOFF_EXCITED_PROPORTION):
-                continue
+        proportion = excited[np.round(hue).astype(np.int64) % 360]
+        keep = np.ones(len(argb), dtype=bool)
+        if filter_enabled:
+            keep = (chroma >= Score.CUTOFF_CHROMA) & (proportion > Score.CUTOFF_EXCITED_PROPORTION)
 
-            proportion_score = proportion * 100.0 * Score.WEIGHT_PROPORTION
-            chroma_weight = Score.WEIGHT_CHROMA_BELOW if hct.chroma < Score.TARGET_CHROMA else Score.WEIGHT_CHROMA_ABOVE
-            chroma_score = (hct.chroma - Score.TARGET_CHROMA) * chroma_weight
-            score = proportion_score + chroma_score
-            scored_hct.append({"hct": hct, "score": score})
+        chroma_weight = np.where(chroma < Score.TARGET_CHROMA, Score.WEIGHT_CHROMA_BELOW, Score.WEIGHT_CHROMA_ABOVE)
+        scores = proportion * 100.0 * Score.WEIGHT_PROPORTION + (chroma - Score.TARGET_CHROMA) * chroma_weight
 
-        scored_hct.sort(key=lambda x: x["score"], reverse=True)
+        candidates = np.flatnonzero(keep)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
 
-        # Get primary colour
-        primary = None
+        # Get primary colour: the best scored one passing the highest chroma/tone cutoff
         for cutoff in range(20, -1, -1):
-            for item in scored_hct:
-                if item["hct"].chroma > cutoff and item["hct"].tone > cutoff * 3:
-                    primary = item["hct"]
-                    break
-            if primary:
-                break
+            passing = (chroma[order] > cutoff) & (tone[order] > cutoff * 3)
+            if passing.any():
+                return DislikeAnalyzer.fix_if_disliked(Hct.from_int(int(argb[order[passing.argmax()]])))
+
+        if filter_enabled:
+            return Score.score(colors_to_population, False)
+        return Hct.from_int(Score.FALLBACK_COLOUR)
+
+
+def load_pixels(image: str, size: int | None = QUANTIZE_SIZE) -> np.ndarray:
+    """Decode `image` into an (N, 3) uint8 RGB buffer of at most `size` pixels per side."""
+    from PIL import Image
+
+    with Image.open(image) as img:
+        if size:
+            img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+    return subsample(img, size) if size else np.asarray(img).reshape(-1, 3)
+
+
+def subsample(img: "Image.Image", size: int = QUANTIZE_SIZE) -> np.ndarray:
+    """Nearest-neighbour (N, 3) uint8 sample of a decoded RGB image, at most `size` pixels per side."""
+    from PIL import Image
+
+    if max(img.size) > size:
+        img = img.copy()
+        img.thumbnail((size, size), Image.Resampling.NEAREST, reducing_gap=None)
+    return np.asarray(img).reshape(-1, 3)
+
 
-        return DislikeAnalyzer.fix_if_disliked(primary) if primary else Score.score(colors_to_population, False)
+def quantize_pixels(pixels: np.ndarray, max_colors: int = 128) -> dict[int, int]:
+    """Celebi (Wu + WSMeans) over a pixel buffer; WSMeans already clusters unique colours weighted by count."""
+    return QuantizeCelebi(pixels.tolist(), max_colors)
 
 
-def score(image: str) -> Hct:
-    return Score.score(ImageQuantizeCelebi(image, 1, 128))
+def score(image: str, size: int | None = QUANTIZE_SIZE) -> Hct:
+    if not size:
+        return Score.score(ImageQuantizeCelebi(image, 1, 128))
+    return Score.score(quantize_pixels(load_pixels(image, size)))
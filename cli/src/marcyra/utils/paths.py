@@ -1,10 +1,8 @@
-import hashlib
 import json
 import os
 import tempfile
 from pathlib import Path
 from typing import Optional
-from PIL import Image
 
 config_dir = Path(os.getenv("XDG_CONFIG_HOME", Path.home() / ".config"))
 data_dir = Path(os.getenv("XDG_DATA_HOME", Path.home() / ".local/share"))
@@ -34,17 +32,27 @@ thumbs_map_path = wallpaper_state_dir / "thumbs.json"  # NEW: output -> absolute
 wallpaper_main_output_path = wallpaper_state_dir / "main-output.txt"
 wallpaper_thumbnail_path = wallpaper_state_dir / "thumbnail.jpg"
 wallpaper_buckets_path = wallpaper_state_dir / "buckets.json"
+wallpaper_buckets_manifest_path = wallpaper_state_dir / "buckets-manifest.json"  # features + centroids for --sort
+wallpaper_history_path = wallpaper_state_dir / "history.json"  # recently shown wallpapers, a ring buffer
+wallpaper_favourites_path = wallpaper_state_dir / "favourites.json"  # resolved paths picked more often by -r
 
 # Wallpaper cache (per-image hash)
 wallpapers_cache_dir = m_cache_dir / "wallpapers"  # each image gets a hashed subdir
+hash_index_path = m_cache_dir / "hashes.json"  # stat fingerprint -> content hash
+library_index_path = m_cache_dir / "library.json"  # image files per wallpaper directory (see utils/library.py)
+cache_db_path = m_cache_dir / "cache.db"  # scores, smart options and scheme records (see utils/cachestore.py)
 
 # Scheme
 scheme_path = m_state_dir / "scheme.json"
 scheme_data_dir = cli_data_dir / "schemes"
+scheme_catalogue_path = m_cache_dir / "scheme-catalogue.json"  # parsed static schemes
 scheme_cache_dir = m_cache_dir / "schemes"
+discord_cache_dir = scheme_cache_dir / "discord"  # compiled Discord css, keyed by colours + template digest
+palette_cache_dir = scheme_cache_dir / "palettes"  # legacy scheme records, migrated into cache.db
 
 # Themes
 templates_dir = cli_data_dir / "templates"
+template_cache_dir = m_cache_dir / "templates"  # compiled templates, keyed by mtime
 
 
 # Utilities
@@ -98,6 +106,17 @@ def atomic_dump(path: Path, content: dict) -> None:
         pass
 
 
+def evict_lru(directory: Path, max_bytes: int) -> None:
+    """Delete the least recently used (oldest mtime) files until `directory` fits in `max_bytes`."""
+    entries = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in os.scandir(directory) if e.is_file()]
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.unlink(path)
+        total -= size
+
+
 def image_cache_dir(image_path: Path | str) -> Path:
     """Return the cache directory for a specific image (by SHA-256 of its content)."""
     return wallpapers_cache_dir / compute_hash(image_path)
@@ -109,21 +128,28 @@ def image_thumb_cache_path(image_path: Path | str) -> Path:
 
 
 def compute_hash(path: Path | str) -> str:
-    sha = hashlib.sha256()
-    with open(path, "rb") as f:
-        while chunk := f.read(8192):
-            sha.update(chunk)
-    return sha.hexdigest()
+    """SHA-256 of the file content, served from the persistent hash index when the file is unchanged."""
+    from marcyra.utils.hashindex import get_hash_index
+
+    return get_hash_index().get(path)
 
 
 def get_thumb(src: Path, cache: Optional[Path] = None) -> Path:
     if not cache:
         cache = image_cache_dir(src)
     thumb = cache / "thumbnail.jpg"
-    if not thumb.exists():
+    from marcyra.utils.cachestore import get_cache_store
+
+    if thumb.exists():
+        get_cache_store().touch_images([cache.name])
+    else:
+        from PIL import Image
+
+        from marcyra.utils.decode import open_reduced
+
         cache.mkdir(parents=True, exist_ok=True)
-        with Image.open(src) as img:
-            img = img.convert("RGB")
-            img.thumbnail((128, 128), Image.LANCZOS)
-            img.save(thumb, "JPEG")
+        img = open_reduced(src, (256, 256))
+        img.thumbnail((128, 128), Image.LANCZOS, reducing_gap=2.0)
+        img.save(thumb, "JPEG")
+        get_cache_store().record_thumb(cache.name, thumb.stat().st_size)
     return thumb
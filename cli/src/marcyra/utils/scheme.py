@@ -1,9 +1,10 @@
 import json
+import os
 import random
 from pathlib import Path
 
 from marcyra.utils.notify import notify
-from marcyra.utils.paths import atomic_dump, scheme_data_dir, scheme_path
+from marcyra.utils.paths import atomic_dump, load_json_or, scheme_catalogue_path, scheme_data_dir, scheme_path
 
 
 class Scheme:
@@ -20,7 +21,7 @@ class Scheme:
             self._flavour = "mocha"
             self._mode = "dark"
             self._variant = "tonalspot"
-            self._colours = read_colours_from_file(self.get_colours_path())
+            self._colours = get_palette(self.name, self.flavour, self.mode)
         else:
             self._name = json["name"]
             self._flavour = json["flavour"]
@@ -170,7 +171,7 @@ class Scheme:
                     "No wallpaper set. Please set a wallpaper via `marcyra wallpaper` before setting a dynamic scheme."
                 )
         else:
-            self._colours = read_colours_from_file(self.get_colours_path())
+            self._colours = get_palette(self.name, self.flavour, self.mode)
 
     def __str__(self) -> str:
         return (
@@ -235,15 +236,72 @@ def get_scheme() -> Scheme:
     return scheme
 
 
+# name -> flavour -> mode -> colours, for every static scheme
+catalogue: dict[str, dict[str, dict[str, dict[str, str]]]] = None
+
+
+def _catalogue_signature() -> list[int]:
+    # Adding, removing or editing any scheme file bumps the newest mtime or the entry count
+    count, newest = 0, scheme_data_dir.stat().st_mtime_ns
+    stack = [scheme_data_dir]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                count += 1
+                newest = max(newest, entry.stat().st_mtime_ns)
+                if entry.is_dir():
+                    stack.append(entry.path)
+    return [count, newest]
+
+
+def _build_catalogue() -> dict[str, dict[str, dict[str, dict[str, str]]]]:
+    return {
+        name.name: {
+            flavour.name: {mode.stem: read_colours_from_file(mode) for mode in sorted(flavour.glob("*.txt"))}
+            for flavour in sorted(name.iterdir())
+            if flavour.is_dir()
+        }
+        for name in sorted(scheme_data_dir.iterdir())
+        if name.is_dir()
+    }
+
+
+def get_catalogue() -> dict[str, dict[str, dict[str, dict[str, str]]]]:
+    """Every static scheme name, flavour, mode and parsed palette.
+
+    Loaded once per process from a cache file that is rebuilt whenever the scheme
+    data directory changes; all queries afterwards are plain dict lookups.
+    """
+    global catalogue
+
+    if catalogue is None:
+        signature = _catalogue_signature()
+        cached = load_json_or(scheme_catalogue_path, {})
+        if cached.get("signature") == signature:
+            catalogue = cached["schemes"]
+        else:
+            catalogue = _build_catalogue()
+            atomic_dump(scheme_catalogue_path, {"signature": signature, "schemes": catalogue})
+
+    return catalogue
+
+
+def get_palette(name: str, flavour: str, mode: str) -> dict[str, str]:
+    try:
+        return dict(get_catalogue()[name][flavour][mode])
+    except KeyError:
+        raise ValueError(f'Scheme "{name} {flavour}" has no {mode} mode')
+
+
 def get_scheme_names() -> list[str]:
-    return [*(f.name for f in scheme_data_dir.iterdir() if f.is_dir()), "dynamic"]
+    return [*get_catalogue(), "dynamic"]
 
 
 def get_scheme_flavours(name: str = None) -> list[str]:
     if name is None:
         name = get_scheme().name
 
-    return ["default"] if name == "dynamic" else [f.name for f in (scheme_data_dir / name).iterdir() if f.is_dir()]
+    return ["default"] if name == "dynamic" else list(get_catalogue()[name])
 
 
 def get_scheme_modes(name: str = None, flavour: str = None) -> list[str]:
@@ -255,4 +313,4 @@ def get_scheme_modes(name: str = None, flavour: str = None) -> list[str]:
     if name == "dynamic":
         return ["light", "dark"]
     else:
-        return [f.stem for f in (scheme_data_dir / name / flavour).iterdir() if f.is_file()]
+        return list(get_catalogue()[name][flavour])
@@ -0,0 +1,171 @@
+import random
+from pathlib import Path
+from typing import Sequence
+
+from marcyra.utils.paths import (
+    atomic_dump,
+    load_json_or,
+    wallpaper_buckets_path,
+    wallpaper_favourites_path,
+    wallpaper_history_path,
+)
+
+HISTORY_SIZE = 256  # wallpapers remembered; recency stops mattering after this many showings
+REPEAT_WINDOW = 20  # default number of recent wallpapers that are never picked again
+FAVOURITE_WEIGHT = 3.0  # favourites come up this many times as often
+BUCKET_BIAS = 0.8  # chance that further outputs draw from the first pick's colour bucket
+MAX_DRAWS = 64  # rejected draws before falling back to the least recently shown wallpaper
+
+
+class AliasTable:
+    """Vose's alias method: O(n) to build, O(1) per weighted draw."""
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        n = len(weights)
+        total = sum(weights)
+        self.prob = [w * n / total for w in weights]
+        self.alias = list(range(n))
+
+        small = [i for i, p in enumerate(self.prob) if p < 1.0]
+        large = [i for i, p in enumerate(self.prob) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            self.alias[s] = g
+            self.prob[g] -= 1.0 - self.prob[s]
+            (small if self.prob[g] < 1.0 else large).append(g)
+        # Whatever is left over is 1 up to rounding
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self) -> int:
+        i = random.randrange(len(self.prob))
+        return i if random.random() < self.prob[i] else self.alias[i]
+
+
+class History:
+    """Ring buffer of the last `HISTORY_SIZE` wallpapers shown, persisted as JSON.
+
+    `age(path)` is the number of wallpapers shown since `path` last was (0 for the most
+    recent), or None if it is not in the buffer.
+    """
+
+    def __init__(self, path: Path, size: int = HISTORY_SIZE) -> None:
+        self.path = path
+        self.size = size
+        data = load_json_or(path, {})
+        entries = data.get("entries", [])[:size]
+        self.entries: list[str | None] = entries + [None] * (size - len(entries))
+        self.count: int = data.get("count", 0)
+        self._seq: dict[str, int] = {}
+        for seq in range(max(0, self.count - size), self.count):
+            if self.entries[seq % size] is not None:
+                self._seq[self.entries[seq % size]] = seq
+
+    def push(self, wall: Path | str) -> None:
+        slot = self.count % self.size
+        old = self.entries[slot]
+        if old is not None and self._seq.get(old) == self.count - self.size:
+            del self._seq[old]
+        self.entries[slot] = str(wall)
+        self._seq[str(wall)] = self.count
+        self.count += 1
+
+    def age(self, wall: str) -> int | None:
+        seq = self._seq.get(wall)
+        return None if seq is None else self.count - 1 - seq
+
+    def save(self) -> None:
+        atomic_dump(self.path, {"count": self.count, "entries": self.entries})
+
+
+class Selector:
+    """Weighted random wallpaper picks over a fixed candidate list.
+
+    Candidates are weighted once (favourites count `FAVOURITE_WEIGHT` times) into alias
+    tables for the whole library and for each colour bucket, so a pick costs O(1) draws.
+    Recency is applied by rejection: a wallpaper shown fewer than `window` picks ago is
+    never taken, and an older one is accepted with probability `age / HISTORY_SIZE`.
+    After the first output, the others draw from its bucket with `BUCKET_BIAS`.
+    """
+
+    def __init__(
+        self, candidates: list[Path], bucket_map: dict[str, list[str]], favourites: set[str] | None = None
+    ) -> None:
+        if favourites is None:
+            favourites = load_favourites()
+        self.candidates = candidates
+        self.keys = [str(p) for p in candidates]
+        weights = [FAVOURITE_WEIGHT if key in favourites else 1.0 for key in self.keys]
+        self.table = AliasTable(weights) if candidates else None
+
+        index = {key: i for i, key in enumerate(self.keys)}
+        self.bucket_of: dict[int, str] = {}
+        self.buckets: dict[str, tuple[list[int], AliasTable]] = {}
+        for bucket_id, walls in bucket_map.items():
+            members = [index[w] for w in walls if w in index]
+            if members:
+                self.buckets[bucket_id] = (members, AliasTable([weights[i] for i in members]))
+                for i in members:
+                    self.bucket_of.setdefault(i, bucket_id)
+
+    def choose(
+        self, targets: list[str], history: History, window: int = REPEAT_WINDOW
+    ) -> tuple[dict[str, Path], str | None]:
+        """Pick a wallpaper per output; returns the picks and the bucket they were drawn around."""
+        chosen: dict[str, Path] = {}
+        if self.table is None:
+            return chosen, None
+
+        taken: set[int] = set()
+        bucket = None
+        for i, out in enumerate(targets):
+            pick = self._draw(history, window, taken, bucket)
+            if i == 0:
+                bucket = self.bucket_of.get(pick)
+            taken.add(pick)
+            chosen[out] = self.candidates[pick]
+        return chosen, bucket
+
+    def _draw(self, history: History, window: int, taken: set[int], bucket: str | None) -> int:
+        for _ in range(MAX_DRAWS):
+            if bucket is not None and random.random() < BUCKET_BIAS:
+                members, table = self.buckets[bucket]
+                pick = members[table.sample()]
+            else:
+                pick = self.table.sample()
+            if pick in taken:
+                continue
+            age = history.age(self.keys[pick])
+            if age is None or (age >= window and random.random() * history.size < age):
+                return pick
+
+        # Small library or large window: the least recently shown wallpaper not taken yet
+        free = [i for i in range(len(self.candidates)) if i not in taken] or list(range(len(self.candidates)))
+        return max(free, key=lambda i: history.size if (age := history.age(self.keys[i])) is None else age)
+
+
+def load_bucket_map() -> dict[str, list[str]]:
+    """Colour buckets as saved by `wallpaper --sort` (resolved paths)."""
+    return load_json_or(wallpaper_buckets_path, {})
+
+
+def load_favourites() -> set[str]:
+    return set(load_json_or(wallpaper_favourites_path, []))
+
+
+def toggle_favourite(wall: Path) -> bool:
+    """Add or remove a wallpaper from the favourites; returns whether it is one now."""
+    favourites = load_favourites()
+    key = str(wall.resolve())
+    added = key not in favourites
+    if added:
+        favourites.add(key)
+    else:
+        favourites.discard(key)
+    atomic_dump(wallpaper_favourites_path, sorted(favourites))
+    return added
+
+
+def load_history() -> History:
+    """Read on every use; the file is small and the CLI and daemon both append to it."""
+    return History(wallpaper_history_path)
@@ -0,0 +1,55 @@
+import os
+import re
+from pathlib import Path
+
+from marcyra.utils.logging import log_message
+from marcyra.utils.paths import atomic_dump, load_json_or, template_cache_dir
+
+PLACEHOLDER = re.compile(r"\{\{\s*\$(\w+)\s*\}\}")
+
+# template path -> (mtime_ns, compiled parts)
+_compiled: dict[str, tuple[int, list[str]]] = {}
+
+
+def compile_template(template: Path) -> list[str]:
+    """Split a template into alternating literal chunks and placeholder names.
+
+    Even indices are literal text, odd indices are placeholder names. The compiled
+    form is memoised in-process and cached on disk, both keyed by the template mtime.
+    """
+    mtime = os.stat(template).st_mtime_ns
+    key = str(template)
+
+    cached = _compiled.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    cache = template_cache_dir / f"{template.name}.json"
+    stored = load_json_or(cache, {})
+    if stored.get("path") == key and stored.get("mtime") == mtime:
+        parts = stored["parts"]
+    else:
+        # re.split with one group alternates literal, name, literal, ...
+        parts = PLACEHOLDER.split(template.read_text())
+        atomic_dump(cache, {"path": key, "mtime": mtime, "parts": parts})
+
+    _compiled[key] = (mtime, parts)
+    return parts
+
+
+def render_template(template: Path, values: dict[str, str], prefix: str = "") -> str:
+    """Fill a template in one pass; unknown placeholders are kept verbatim and reported."""
+    parts = compile_template(template)
+    out = parts.copy()
+    unknown = []
+    for i in range(1, len(parts), 2):
+        name = parts[i]
+        if name in values:
+            out[i] = f"{prefix}{values[name]}"
+        else:
+            out[i] = f"{{{{ ${name} }}}}"
+            unknown.append(name)
+
+    if unknown:
+        log_message(f'Unknown placeholders in template "{template.name}": {", ".join(sorted(set(unknown)))}')
+    return "".join(out)
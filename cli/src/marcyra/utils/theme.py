@@ -1,14 +1,26 @@
+import hashlib
+import os
 import subprocess
-
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Callable
 
-from marcyra.utils.logging import log_exception
+from marcyra.utils.logging import log_debug, log_exception
+from marcyra.utils.templates import render_template
 from marcyra.utils.paths import (
     config_dir,
+    discord_cache_dir,
+    evict_lru,
     m_state_dir,
     templates_dir,
 )
 
+DISCORD_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
 
 def gen_conf(colours: dict[str, str]) -> str:
     conf = ""
@@ -25,10 +37,7 @@ def gen_scss(colours: dict[str, str]) -> str:
 
 
 def gen_replace(colours: dict[str, str], template: Path, hash: bool = False) -> str:
-    template = template.read_text()
-    for name, colour in colours.items():
-        template = template.replace(f"{{{{ ${name} }}}}", f"#{colour}" if hash else colour)
-    return template
+    return render_template(template, colours, prefix="#" if hash else "")
 
 
 def gen_sequences(colours: dict[str, str]) -> str:
@@ -74,9 +83,43 @@ def c2s(c: str, *i: list[int]) -> str:
     return f"\x1b]{';'.join(map(str, i))};rgb:{c[0:2]}/{c[2:4]}/{c[4:6]}\x1b\\"
 
 
-def write_file(path: Path, content: str) -> None:
+# Writes and reload signals performed/avoided by the current `apply_colours()` call
+write_stats: Counter[str] = Counter()
+_write_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _write_stats_lock:
+        write_stats[key] += 1
+
+
+def write_file(path: Path, content: str) -> bool:
+    """Write `content` unless the file already holds exactly it. Returns whether it was written.
+
+    Skipping identical writes keeps file watchers (Hyprland, GTK, Discord) from reloading.
+    """
+    data = content.encode()
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            _count("writes_skipped")
+            return False
+    except FileNotFoundError:
+        pass
+
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content)
+    path.write_bytes(data)
+    _count("writes")
+    return True
+
+
+def reload_process(name: str, changed: bool) -> None:
+    """Ask a running program to reload its theme, only if its theme file changed."""
+    if not changed:
+        _count("signals_skipped")
+        return
+
+    subprocess.run(["killall", "-USR2", name], stderr=subprocess.DEVNULL)
+    _count("signals")
 
 
 @log_exception
@@ -86,9 +129,8 @@ def apply_hypr(conf: str) -> None:
 
 @log_exception
 def apply_terms(sequences: str) -> None:
-    state = m_state_dir / "sequences.txt"
-    state.parent.mkdir(parents=True, exist_ok=True)
-    state.write_text(sequences)
+    if not write_file(m_state_dir / "sequences.txt", sequences):
+        return
 
     pts_path = Path("/dev/pts")
     for pt in pts_path.iterdir():
@@ -103,8 +145,7 @@ def apply_terms(sequences: str) -> None:
 @log_exception
 def apply_btop(colours: dict[str, str]) -> None:
     template = gen_replace(colours, templates_dir / "btop.theme", hash=True)
-    write_file(config_dir / "btop/themes/marcyra.theme", template)
-    subprocess.run(["killall", "-USR2", "btop"], stderr=subprocess.DEVNULL)
+    reload_process("btop", write_file(config_dir / "btop/themes/marcyra.theme", template))
 
 
 @log_exception
@@ -116,19 +157,26 @@ def apply_nvtop(colours: dict[str, str]) -> None:
 @log_exception
 def apply_htop(colours: dict[str, str]) -> None:
     template = gen_replace(colours, templates_dir / "htop.theme", hash=True)
-    write_file(config_dir / "htop/htoprc", template)
-    subprocess.run(["killall", "-USR2", "htop"], stderr=subprocess.DEVNULL)
+    reload_process("htop", write_file(config_dir / "htop/htoprc", template))
 
 
 @log_exception
 def apply_gtk(colours: dict[str, str], mode: str) -> None:
     template = gen_replace(colours, templates_dir / "gtk.css", hash=True)
-    write_file(config_dir / "gtk-3.0/gtk.css", template)
-    write_file(config_dir / "gtk-4.0/gtk.css", template)
+    changed = write_file(config_dir / "gtk-3.0/gtk.css", template)
+    changed = write_file(config_dir / "gtk-4.0/gtk.css", template) or changed
+
+    # Mode of the last successful dconf update
+    mode_state = m_state_dir / "gtk-mode.txt"
+    if not changed and mode_state.exists() and mode_state.read_text() == mode:
+        _count("signals_skipped")
+        return
 
     subprocess.run(["dconf", "write", "/org/gnome/desktop/interface/gtk-theme", "'adw-gtk3-dark'"])
     subprocess.run(["dconf", "write", "/org/gnome/desktop/interface/color-scheme", f"'prefer-{mode}'"])
     subprocess.run(["dconf", "write", "/org/gnome/desktop/interface/icon-theme", f"'Papirus-{mode.capitalize()}'"])
+    _count("signals")
+    write_file(mode_state, mode)
 
 
 @log_exception
@@ -137,11 +185,10 @@ def apply_qt(colours: dict[str, str], mode: str) -> None:
     write_file(config_dir / "qt5ct/colors/marcyra.colors", template)
     write_file(config_dir / "qt6ct/colors/marcyra.colors", template)
 
-    qtct = (templates_dir / "qtct.conf").read_text()
-    qtct = qtct.replace("{{ $mode }}", mode.capitalize())
-
     for ver in 5, 6:
-        conf = qtct.replace("{{ $config }}", str(config_dir / f"qt{ver}ct"))
+        conf = render_template(
+            templates_dir / "qtct.conf", {"mode": mode.capitalize(), "config": str(config_dir / f"qt{ver}ct")}
+        )
 
         if ver == 5:
             conf += """
@@ -158,13 +205,40 @@ general="Sans Serif,12,-1,5,400,0,0,0,0,0,0,0,0,0,0,1"
         write_file(config_dir / f"qt{ver}ct/qt{ver}ct.conf", conf)
 
 
-@log_exception
-def apply_discord(scss: str) -> None:
+def compile_discord(scss: str) -> str:
+    """Compile the Discord theme, reusing cached css for the same colours and template.
+
+    Entries are touched on every hit and the least recently used ones are evicted once
+    the cache grows past `DISCORD_CACHE_MAX_BYTES`.
+    """
+    template = templates_dir / "discord.scss"
+    digest = hashlib.sha256(scss.encode() + b"\0" + template.read_bytes()).hexdigest()
+    cached = discord_cache_dir / f"{digest}.css"
+
+    try:
+        conf = cached.read_text()
+        os.utime(cached)
+        return conf
+    except FileNotFoundError:
+        pass
+
     import tempfile
 
     with tempfile.TemporaryDirectory("w") as tmp_dir:
         (Path(tmp_dir) / "_colours.scss").write_text(scss)
-        conf = subprocess.check_output(["sass", "-I", tmp_dir, templates_dir / "discord.scss"], text=True)
+        conf = subprocess.check_output(["sass", "-I", tmp_dir, template], text=True)
+
+    discord_cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_suffix(".tmp")
+    tmp.write_text(conf)
+    tmp.replace(cached)
+    evict_lru(discord_cache_dir, DISCORD_CACHE_MAX_BYTES)
+    return conf
+
+
+@log_exception
+def apply_discord(scss: str) -> None:
+    conf = compile_discord(scss)
 
     for client in "Equicord", "Vencord", "BetterDiscord", "equibop", "vesktop", "legcord":
         write_file(config_dir / client / "themes/marcyra.theme.css", conf)
@@ -176,14 +250,46 @@ def apply_spicetify(colours: dict[str, str], mode: str) -> None:
     write_file(config_dir / "spicetify/Themes/marcyra/color.ini", template)
 
 
+def run_targets(targets: dict[str, Callable[[], None]]) -> dict[str, float]:
+    """Run theme targets concurrently and return how long each one took (seconds).
+
+    Targets must be independent of each other; steps that need ordering (e.g. writing
+    the GTK css before switching the theme with dconf) belong in the same target.
+    Each target is wrapped in `log_exception`, so one failure does not stop the others.
+    """
+
+    def timed(func: Callable[[], None]) -> float:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        futures = {name: pool.submit(timed, func) for name, func in targets.items()}
+    timings = {name: future.result() for name, future in futures.items()}
+
+    log_debug(f"Applied {len(targets)} theme targets in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for name, elapsed in sorted(timings.items(), key=lambda kv: kv[1], reverse=True):
+        log_debug(f"  {name:<10} {elapsed * 1000:8.1f} ms")
+    return timings
+
+
 def apply_colours(colours: dict[str, str], mode: str) -> None:
-    apply_terms(gen_sequences(colours))
-    apply_hypr(gen_conf(colours))
-    apply_btop(colours)
-    apply_nvtop(colours)
-    apply_htop(colours)
-    apply_qt(colours, mode)
-    apply_gtk(colours, mode)
-    apply_discord(gen_scss(colours))
-    apply_spicetify(colours, mode)
-    return
+    write_stats.clear()
+    run_targets(
+        {
+            "terms": partial(apply_terms, gen_sequences(colours)),
+            "hypr": partial(apply_hypr, gen_conf(colours)),
+            "btop": partial(apply_btop, colours),
+            "nvtop": partial(apply_nvtop, colours),
+            "htop": partial(apply_htop, colours),
+            "qt": partial(apply_qt, colours, mode),
+            "gtk": partial(apply_gtk, colours, mode),
+            "discord": partial(apply_discord, gen_scss(colours)),
+            "spicetify": partial(apply_spicetify, colours, mode),
+        }
+    )
+    log_debug(
+        f"Theme files: {write_stats['writes']} written, {write_stats['writes_skipped']} unchanged; "
+        f"reloads: {write_stats['signals']} sent, {write_stats['signals_skipped']} avoided"
+    )
@@ -0,0 +1,111 @@
+import struct
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image, TiffImagePlugin
+
+from marcyra.utils import decode
+
+SIZE = (100, 75)  # thumbnail size asked for; 402x301 sources reduce by 4
+FACTOR = 4
+
+
+def sample_pixels() -> np.ndarray:
+    # Odd sizes so the last band, strip and tile column are all partial
+    return (np.random.default_rng(0).random((301, 402, 3)) * 255).astype(np.uint8)
+
+
+def write_strips(path: Path, pixels: np.ndarray, rows_per_strip: int = 16) -> None:
+    info = TiffImagePlugin.ImageFileDirectory_v2()
+    info[TiffImagePlugin.ROWSPERSTRIP] = rows_per_strip
+    Image.fromarray(pixels).save(path, tiffinfo=info)
+
+
+def write_tiles(path: Path, pixels: np.ndarray, tile: int = 64) -> None:
+    """Minimal uncompressed tiled RGB TIFF; Pillow itself only writes strips."""
+    height, width, _ = pixels.shape
+    tiles = []
+    for y in range(0, height, tile):
+        for x in range(0, width, tile):
+            padded = np.zeros((tile, tile, 3), dtype=np.uint8)
+            part = pixels[y : y + tile, x : x + tile]
+            padded[: part.shape[0], : part.shape[1]] = part
+            tiles.append(padded.tobytes())
+
+    count = len(tiles)
+    tags = [
+        (256, 4, 1, width),
+        (257, 4, 1, height),
+        (258, 3, 3, None),  # BitsPerSample, 3 values stored after the IFD
+        (259, 3, 1, 1),  # no compression
+        (262, 3, 1, 2),  # RGB
+        (277, 3, 1, 3),
+        (284, 3, 1, 1),  # chunky
+        (322, 3, 1, tile),
+        (323, 3, 1, tile),
+        (324, 4, count, None),  # TileOffsets
+        (325, 4, count, None),  # TileByteCounts
+    ]
+    bits_at = 8 + 2 + len(tags) * 12 + 4
+    offsets_at = bits_at + 6
+    counts_at = offsets_at + 4 * count
+    data_at = counts_at + 4 * count
+    deferred = {258: bits_at, 324: offsets_at, 325: counts_at}
+
+    out = bytearray(b"II*\0" + struct.pack("<IH", 8, len(tags)))
+    for tag, kind, n, value in tags:
+        value = deferred.get(tag, value)
+        packed = struct.pack("<HH", value, 0) if kind == 3 and n == 1 else struct.pack("<I", value)
+        out += struct.pack("<HHI", tag, kind, n) + packed
+    out += struct.pack("<I", 0) + struct.pack("<3H", 8, 8, 8)
+    out += struct.pack(f"<{count}I", *(data_at + i * len(tiles[0]) for i in range(count)))
+    out += struct.pack(f"<{count}I", *(len(t) for t in tiles))
+    path.write_bytes(bytes(out) + b"".join(tiles))
+
+
+@pytest.fixture
+def banded(monkeypatch):
+    """Force the banded path on small files and fail if `open_reduced` falls back to a full decode."""
+    monkeypatch.setattr(decode, "TIFF_BANDED_PIXELS", 1000)
+    monkeypatch.setattr(decode, "TIFF_BAND_PIXELS", 20000)  # 48-row bands, several per strip and tile
+
+    def fallback(message: str) -> None:
+        raise AssertionError(message)
+
+    monkeypatch.setattr(decode, "log_debug", fallback)
+
+    results = []
+    reduce_tiff = decode._reduce_tiff
+
+    def spy(*args):
+        results.append(reduce_tiff(*args))
+        return results[-1]
+
+    monkeypatch.setattr(decode, "_reduce_tiff", spy)
+    return results
+
+
+@pytest.mark.parametrize("write", [write_strips, write_tiles], ids=["strips", "tiles"])
+def test_banded_tiff_matches_full_decode(tmp_path, banded, write):
+    path = tmp_path / "wall.tif"
+    write(path, sample_pixels())
+    with Image.open(path) as img:
+        assert len(img.tile) > 1
+        expected = img.convert("RGB").reduce(FACTOR)
+
+    reduced = decode.open_reduced(path, SIZE)
+
+    assert banded and banded[0] is not None
+    assert reduced.size == expected.size
+    assert np.array_equal(np.asarray(reduced), np.asarray(expected))
+
+
+def test_small_tiff_decodes_whole(tmp_path):
+    path = tmp_path / "wall.tif"
+    write_strips(path, sample_pixels())
+
+    reduced = decode.open_reduced(path, SIZE)
+
+    assert reduced.mode == "RGB"
+    assert reduced.size == (402, 301)
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from materialyoucolor.dislike.dislike_analyzer import DislikeAnalyzer
+from materialyoucolor.hct import Hct
+from materialyoucolor.utils.math_utils import sanitize_degrees_int
+
+from marcyra.utils.material.score import Score, hct_arrays
+
+
+def reference_score(colors_to_population: dict, filter_enabled: bool = False) -> Hct | None:
+    """The per-colour `Score.score` loop from before it was vectorised.
+
+    It differs from the original only where that one never returned: it divided by zero
+    on an empty palette and recursed forever when no colour passed even unfiltered (e.g.
+    only black). Those cases return None here; `Score.score` uses its fallback colour.
+    """
+    colors_hct = []
+    hue_population = [0] * 360
+    population_sum = 0
+
+    for rgb, population in colors_to_population.items():
+        hct = Hct.from_int(rgb)
+        colors_hct.append(hct)
+        hue = int(hct.hue)
+        hue_population[hue] += population
+        population_sum += population
+
+    if not population_sum:
+        return None
+
+    hue_excited_proportions = [0.0] * 360
+
+    for hue in range(360):
+        proportion = hue_population[hue] / population_sum
+        for i in range(hue - 14, hue + 16):
+            neighbor_hue = int(sanitize_degrees_int(i))
+            hue_excited_proportions[neighbor_hue] += proportion
+
+    scored_hct = []
+    for hct in colors_hct:
+        hue = int(sanitize_degrees_int(round(hct.hue)))
+        proportion = hue_excited_proportions[hue]
+
+        if filter_enabled and (hct.chroma < Score.CUTOFF_CHROMA or proportion <= Score.CUTOFF_EXCITED_PROPORTION):
+            continue
+
+        proportion_score = proportion * 100.0 * Score.WEIGHT_PROPORTION
+        chroma_weight = Score.WEIGHT_CHROMA_BELOW if hct.chroma < Score.TARGET_CHROMA else Score.WEIGHT_CHROMA_ABOVE
+        chroma_score = (hct.chroma - Score.TARGET_CHROMA) * chroma_weight
+        score = proportion_score + chroma_score
+        scored_hct.append({"hct": hct, "score": score})
+
+    scored_hct.sort(key=lambda x: x["score"], reverse=True)
+
+    primary = None
+    for cutoff in range(20, -1, -1):
+        for item in scored_hct:
+            if item["hct"].chroma > cutoff and item["hct"].tone > cutoff * 3:
+                primary = item["hct"]
+                break
+        if primary:
+            break
+
+    if primary:
+        return DislikeAnalyzer.fix_if_disliked(primary)
+    return reference_score(colors_to_population, False) if filter_enabled else None
+
+
+def random_palette(seed: int, size: int = 128) -> dict[int, int]:
+    rng = np.random.default_rng(seed)
+    rgb = rng.integers(0, 0x1000000, size)
+    population = rng.integers(1, 5000, size)
+    return {0xFF000000 | int(c): int(p) for c, p in zip(rgb, population)}
+
+
+PALETTES = {
+    "vivid": {0xFFE53935: 1200, 0xFF1E88E5: 900, 0xFF43A047: 700, 0xFFFDD835: 300, 0xFF8E24AA: 120},
+    "muted with accent": {0xFF6D5D4B: 8000, 0xFF7A6A58: 6000, 0xFF5C5046: 4000, 0xFF1565C0: 60},
+    "single colour": {0xFF00897B: 1},
+    "dislikes": {0xFF8B8B00: 500, 0xFF6B6B2F: 400, 0xFF4E342E: 300},
+    "near duplicates": {0xFFFF0000: 10, 0xFFFE0000: 10, 0xFFFF0100: 10},
+    "grey only": {0xFF808080: 100, 0xFF202020: 50, 0xFFFFFFFF: 10},
+    "black only": {0xFF000000: 100},
+    "empty": {},
+    **{f"random {seed}": random_palette(seed) for seed in range(24)},
+}
+
+
+@pytest.mark.parametrize("filter_enabled", [False, True])
+@pytest.mark.parametrize("palette", PALETTES.values(), ids=PALETTES.keys())
+def test_score_matches_reference(palette: dict[int, int], filter_enabled: bool):
+    expected = reference_score(palette, filter_enabled)
+    expected = expected.to_int() if expected is not None else Score.FALLBACK_COLOUR
+    assert Score.score(palette, filter_enabled).to_int() == expected
+
+
+@pytest.mark.parametrize("palette", ["black only", "empty"])
+def test_score_falls_back_without_usable_colours(palette: str):
+    assert Score.score(PALETTES[palette], True).to_int() == Score.FALLBACK_COLOUR
+
+
+def test_hct_arrays_match_hct():
+    argb = np.array(list(random_palette(0, 4096)) + [0xFF000000, 0xFFFFFFFF, 0xFF808080], dtype=np.int64)
+    hue, chroma, tone = hct_arrays(argb)
+    for i, colour in enumerate(argb.tolist()):
+        hct = Hct.from_int(colour)
+        assert tone[i] == pytest.approx(hct.tone, abs=1e-9)
+        assert chroma[i] == pytest.approx(hct.chroma, abs=1e-9)
+        if hct.chroma > 1e-6:
+            assert hue[i] == pytest.approx(hct.hue, abs=1e-9)
@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+
+import marcyra.utils.importprofile
+from marcyra.utils.importprofile import STARTUP_BUDGET_MS
+
+HEAVY_MODULES = ["numpy", "PIL", "sklearn", "materialyoucolor"]
+RUNS = 3  # best of, so .pyc compilation and a busy machine do not count
+
+# Times `marcyra scheme list --names` from the first import to exit, then reports which
+# heavy modules it loaded. Interpreter startup is outside the budget.
+SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+from marcyra import main
+
+main(["scheme", "list", "--names"])
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [m for m in sys.argv[1:] if m in sys.modules]
+print(json.dumps({"elapsed": elapsed, "loaded": loaded}))
+"""
+
+# Loads the profiler by path so it is enabled before the `marcyra` package executes,
+# then reports the modules it timed and the total import time.
+PROFILE_SCRIPT = """
+import importlib.util, json, sys
+
+spec = importlib.util.spec_from_file_location("importprofile", sys.argv[1])
+importprofile = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(importprofile)
+profiler = importprofile.enable()
+
+from marcyra import main
+
+main(["scheme", "list", "--names"])
+print(json.dumps({"timings": profiler.timings, "imports": profiler.imports}))
+"""
+
+
+def clean_env(home: str) -> dict[str, str]:
+    # Fresh home so no user state is read; the profiler would add its own overhead
+    env = {k: v for k, v in os.environ.items() if not k.startswith("XDG_") and k != "MARCYRA_IMPORT_PROFILE"}
+    env["HOME"] = home
+    return env
+
+
+def run_scheme_list(home: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT, *HEAVY_MODULES], env=clean_env(home), capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_scheme_list_names_stays_light(tmp_path):
+    runs = [run_scheme_list(str(tmp_path)) for _ in range(RUNS)]
+
+    assert runs[0]["loaded"] == []
+    best = min(run["elapsed"] for run in runs)
+    assert best < STARTUP_BUDGET_MS, f"scheme list --names took {best:.1f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)"
+
+
+def test_profiler_times_submodules(tmp_path):
+    result = subprocess.run(
+        [sys.executable, "-c", PROFILE_SCRIPT, marcyra.utils.importprofile.__file__],
+        env=clean_env(str(tmp_path)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(result.stdout.splitlines()[-1])
+    timings = report["timings"]
+
+    # Loaded through `from marcyra.subcommands import ...` with the package already imported
+    assert "marcyra.subcommands.scheme" in timings
+    assert "marcyra.subcommands.wallpaper" in timings
+    assert "Imports:" in result.stderr
+
+    # Nested modules count towards their parent and the total, not on their own
+    own, cumulative = timings["marcyra"]
+    assert cumulative >= timings["marcyra.subcommands.scheme"][1] + own
+    assert report["imports"] >= timings["marcyra"][1]
@@ -1,4 +1 @@
-while true; do
-    marcyra wallpaper -r ~/Pictures/Wallpapers;
-    sleep 60;
-done
\ No newline at end of file
+exec marcyra wallpaper daemon ~/Pictures/Wallpapers --interval 60